@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Export the sidecar's sentence-transformers model to ONNX and quantize it to INT8.
+
+The sidecar loads the result when EMBEDDING_ONNX_DIR points at the output
+directory. Dynamic INT8 quantization halves (vs FP16) / quarters (vs FP32)
+the weight bytes streamed per forward pass and lets ONNX Runtime use VNNI
+int8 dot-product kernels on supporting CPUs.
+
+Prerequisites (tooling only, not needed by the sidecar at runtime):
+    pip install onnx onnxruntime transformers torch
+
+Output directory layout:
+    model.onnx        FP32 transformer (last_hidden_state output)
+    model_int8.onnx   Dynamically quantized INT8 weights (loaded by the sidecar)
+    tokenizer files   Saved alongside for AutoTokenizer.from_pretrained()
+
+Usage:
+    python3 scripts/export_onnx_model.py --output models/all-MiniLM-L6-v2-onnx
+    EMBEDDING_ONNX_DIR=models/all-MiniLM-L6-v2-onnx python3 sidecar/server.py
+"""
+import argparse
+import logging
+import os
+import sys
+import torch
+from onnxruntime.quantization import QuantType, quantize_dynamic
+from transformers import AutoModel, AutoTokenizer
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def export_onnx(model_name, output_dir, opset=14):
+    """
+    Export the HuggingFace transformer behind a sentence-transformers model to ONNX.
+
+    Args:
+        model_name: HuggingFace model id (e.g., sentence-transformers/all-MiniLM-L6-v2)
+        output_dir: Directory for model.onnx and tokenizer files
+        opset: ONNX opset version
+
+    Returns:
+        Path to the FP32 ONNX model
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    onnx_path = os.path.join(output_dir, "model.onnx")
+
+    logger.info(f"Loading {model_name}")
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModel.from_pretrained(model_name).eval()
+
+    dummy = tokenizer(["Yellow taxi trip from zone 132 to zone 236"], return_tensors="pt")
+    input_names = ["input_ids", "attention_mask", "token_type_ids"]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+    logger.info(f"Exporting ONNX graph to {onnx_path}")
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(dummy[name] for name in input_names),
+            onnx_path,
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset,
+        )
+
+    tokenizer.save_pretrained(output_dir)
+    return onnx_path
+
+
+def quantize_int8(onnx_path, output_dir):
+    """
+    Apply ONNX Runtime dynamic INT8 quantization to the exported model weights.
+
+    Returns:
+        Path to the quantized model
+    """
+    int8_path = os.path.join(output_dir, "model_int8.onnx")
+    logger.info(f"Quantizing weights to INT8: {int8_path}")
+    quantize_dynamic(onnx_path, int8_path, weight_type=QuantType.QInt8)
+
+    fp32_mb = os.path.getsize(onnx_path) / (1024 * 1024)
+    int8_mb = os.path.getsize(int8_path) / (1024 * 1024)
+    logger.info(f"  - FP32 model: {fp32_mb:.1f} MB")
+    logger.info(f"  - INT8 model: {int8_mb:.1f} MB")
+    return int8_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the embedding model to INT8 ONNX")
+    parser.add_argument("--model", default="sentence-transformers/all-MiniLM-L6-v2",
+                        help="HuggingFace model id (default: sentence-transformers/all-MiniLM-L6-v2)")
+    parser.add_argument("--output", required=True, help="Output directory (e.g., models/all-MiniLM-L6-v2-onnx)")
+    parser.add_argument("--opset", type=int, default=14, help="ONNX opset version (default: 14)")
+    args = parser.parse_args()
+
+    try:
+        onnx_path = export_onnx(args.model, args.output, opset=args.opset)
+        quantize_int8(onnx_path, args.output)
+        logger.info(f"✓ Export complete. Set EMBEDDING_ONNX_DIR={args.output} to use it in the sidecar.")
+    except Exception as e:
+        logger.error(f"ONNX export failed: {e}", exc_info=True)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -13,14 +13,16 @@ Prerequisites:
       python3 scripts/prepare_demo_data.py
 
 Usage:
-  python3 scripts/prepare_demo_data.py
+  python3 scripts/prepare_demo_data.py [--encoder ivfpq|ivfsq8]
 """
 
+import argparse
 import os
 import sys
 import socket
 import grpc
 import urllib.request
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 import pyarrow.parquet as pq
 import faiss
@@ -41,7 +43,13 @@ INDEX_DIR = os.path.join(REPO_ROOT, "data", "indexes")
 INDEX_FILE = os.path.join(INDEX_DIR, "nyc_taxi_2023.index")
 SAMPLE_SIZE = 10_000
 RANDOM_SEED = 42
-BATCH_SIZE = 256  # texts per gRPC batch call
+BATCH_SIZE = 1024  # texts per gRPC batch call (packed float32 responses)
+EMBED_WORKERS = 8  # concurrent in-flight batch calls
+GRPC_CHANNEL_OPTIONS = [
+    ('grpc.max_send_message_length', 64 * 1024 * 1024),
+    ('grpc.max_receive_message_length', 64 * 1024 * 1024),
+    ('grpc.keepalive_time_ms', 30_000),  # keep the HTTP/2 connection alive on long runs
+]
 
 
 # ── Step 1: Download and sample ───────────────────────────────────────────────
@@ -105,18 +113,24 @@ def _check_sidecar():
         sys.exit(1)
 
 
-def _make_text(row) -> str:
-    """Convert a taxi trip row into a natural-language string for embedding."""
-    pu = int(row.get('PULocationID', 0))
-    do = int(row.get('DOLocationID', 0))
-    dist = float(row.get('trip_distance', 0))
-    fare = float(row.get('fare_amount', 0))
-    passengers = int(row.get('passenger_count', 1))
-    pax = "passengers" if passengers > 1 else "passenger"
-    return (
-        f"Yellow taxi trip from zone {pu} to zone {do}, "
-        f"{dist:.1f} miles, ${fare:.2f} fare, {passengers} {pax}"
-    )
+def _make_texts(df) -> list:
+    """Convert taxi trip rows into natural-language strings for embedding.
+
+    Columns are coerced to primitive arrays once up front so the formatting
+    loop runs over plain scalars instead of per-row pandas objects.
+    """
+    pu = df['PULocationID'].astype(np.int64).to_numpy()
+    do = df['DOLocationID'].astype(np.int64).to_numpy()
+    dist = df['trip_distance'].astype(np.float64).to_numpy()
+    fare = df['fare_amount'].astype(np.float64).to_numpy()
+    passengers = df['passenger_count'].astype(np.int64).to_numpy()
+
+    return [
+        f"Yellow taxi trip from zone {pu[i]} to zone {do[i]}, "
+        f"{dist[i]:.1f} miles, ${fare[i]:.2f} fare, {passengers[i]} "
+        f"{'passengers' if passengers[i] > 1 else 'passenger'}"
+        for i in range(len(df))
+    ]
 
 
 def generate_embeddings(demo_file: str) -> np.ndarray:
@@ -126,63 +140,97 @@ def generate_embeddings(demo_file: str) -> np.ndarray:
 
     import pandas as pd
     df = pd.read_parquet(demo_file)
-    texts = [_make_text(row) for _, row in df.iterrows()]
-
-    channel = grpc.insecure_channel(SIDECAR_ADDR)
-    stub = vector_service_pb2_grpc.EmbeddingServiceStub(channel)
+    texts = _make_texts(df)
 
-    all_embeddings = []
     total = len(texts)
-
-    for start in range(0, total, BATCH_SIZE):
-        batch = texts[start : start + BATCH_SIZE]
-        request = vector_service_pb2.EmbeddingBatchRequest(texts=batch)
-        response = stub.GenerateEmbeddingBatch(request)
-        for emb in response.embeddings:
-            all_embeddings.append(emb.vector)  # field name is `vector`
-        done = min(start + BATCH_SIZE, total)
-        print(f"  {done}/{total} embeddings generated", end="\r", flush=True)
+    starts = range(0, total, BATCH_SIZE)
+
+    # One channel for the whole run; closed on the way out, including on errors
+    with grpc.insecure_channel(SIDECAR_ADDR, options=GRPC_CHANNEL_OPTIONS) as channel:
+        stub = vector_service_pb2_grpc.EmbeddingServiceStub(channel)
+
+        def embed_batch(start):
+            batch = texts[start : start + BATCH_SIZE]
+            request = vector_service_pb2.EmbeddingBatchRequest(texts=batch, packed=True)
+            response = stub.GenerateEmbeddingBatch(request)
+            # packed_matrix is a row-major float32 [len(batch), dimension] buffer
+            return np.frombuffer(response.packed_matrix, dtype=np.float32).reshape(-1, response.dimension)
+
+        # Keep several batches in flight over the shared channel so the sidecar is
+        # not idle during each round trip (gRPC releases the GIL while waiting).
+        # executor.map yields results in submission order.
+        # Each batch is copied straight into its slice of one preallocated matrix,
+        # sized once the first response reports the model dimension.
+        embeddings = None
+        with ThreadPoolExecutor(max_workers=EMBED_WORKERS) as executor:
+            for start, chunk in zip(starts, executor.map(embed_batch, starts)):
+                if embeddings is None:
+                    embeddings = np.empty((total, chunk.shape[1]), dtype=np.float32)
+                embeddings[start : start + chunk.shape[0]] = chunk
+                done = min(start + BATCH_SIZE, total)
+                print(f"  {done}/{total} embeddings generated", end="\r", flush=True)
 
     print()
-    embeddings = np.array(all_embeddings, dtype='float32')
     print(f"  Generated {embeddings.shape[0]:,} embeddings, dim={embeddings.shape[1]}")
     return embeddings
 
 
-# ── Step 3: Build FAISS IVF-PQ index ─────────────────────────────────────────
+# ── Step 3: Build FAISS IVF index ────────────────────────────────────────────
 
-def build_faiss_index(embeddings: np.ndarray) -> str:
-    """Build a compact IVF-PQ index suitable for 10K vectors."""
-    print("Step 4: Building FAISS index...")
+def build_faiss_index(embeddings: np.ndarray, encoder: str = "ivfpq") -> str:
+    """Build a compact IVF index suitable for 10K vectors.
 
-    # L2-normalise so cosine ≈ L2 distance on the unit sphere
-    faiss.normalize_L2(embeddings)
+    encoder="ivfpq" stores product-quantized codes (smallest index);
+    encoder="ivfsq8" stores one INT8 scalar-quantized byte per dimension —
+    larger, but higher recall and no PQ training or code-table lookups.
+    """
+    print("Step 4: Building FAISS index...")
 
     n, d = embeddings.shape   # 10000, 384
 
     # For 10K vectors: nlist=32 gives ~300 vectors/cell (√10K ≈ 100, but 32
-    # is safer for training), m=8 subvectors × 8 bits = 1 byte/subvector
+    # is safer for training), m=8 subvectors. With AVX2/NEON we use the
+    # fast-scan layout: 4-bit codes (m/2 = 4 bytes/vector) scanned by SIMD
+    # kernels; otherwise classic PQ with 8 bits = 1 byte/subvector.
     nlist = 32
     m = 8
-    nbits = 8
+    options = faiss.get_compile_options()
+    fast_scan = any(simd in options for simd in ("AVX2", "AVX512", "NEON"))
 
     quantizer = faiss.IndexFlatL2(d)
-    index = faiss.IndexIVFPQ(quantizer, d, nlist, m, nbits)
+    if encoder == "ivfsq8":
+        ivf = faiss.IndexIVFScalarQuantizer(quantizer, d, nlist, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_L2)
+        description = f"IVF{nlist},SQ8"
+    elif fast_scan:
+        nbits = 4
+        ivf = faiss.IndexIVFPQFastScan(quantizer, d, nlist, m, nbits, faiss.METRIC_L2)
+        description = f"IVF{nlist},PQ{m}×{nbits}fs"
+    else:
+        nbits = 8
+        ivf = faiss.IndexIVFPQ(quantizer, d, nlist, m, nbits)
+        description = f"IVF{nlist},PQ{m}×{nbits}"
 
-    print(f"  Training IVF{nlist},PQ{m}×{nbits} on {n:,} vectors...")
+    # L2-normalise inside the index so cosine ≈ L2 distance on the unit
+    # sphere; applied per batch on train/add and to queries at search time
+    index = faiss.IndexPreTransform(faiss.NormalizationTransform(d, 2.0), ivf)
+
+    print(f"  Training {description} on {n:,} vectors...")
     index.train(embeddings)
 
     print(f"  Adding {n:,} vectors...")
     index.add(embeddings)
-    index.nprobe = 4    # search 4 cells by default — good recall for 10K
+    ivf.nprobe = 4      # search 4 cells by default — good recall for 10K
 
     os.makedirs(INDEX_DIR, exist_ok=True)
-    faiss.write_index(index, INDEX_FILE)
+    # Write then rename so a running sidecar's memory-mapped copy stays valid
+    faiss.write_index(index, INDEX_FILE + ".tmp")
+    os.replace(INDEX_FILE + ".tmp", INDEX_FILE)
 
     size_mb = os.path.getsize(INDEX_FILE) / 1_048_576
     print(f"  FAISS index saved: {INDEX_FILE}")
     print(f"    Vectors : {index.ntotal:,}")
     print(f"    Clusters: {nlist}")
+    print(f"    Codes   : {ivf.code_size} B/vector ({description})")
     print(f"    Size    : {size_mb:.1f} MB")
     return INDEX_FILE
 
@@ -190,6 +238,11 @@ def build_faiss_index(embeddings: np.ndarray) -> str:
 # ── Main ──────────────────────────────────────────────────────────────────────
 
 def main():
+    parser = argparse.ArgumentParser(description="Prepare the NYC taxi demo dataset and FAISS index")
+    parser.add_argument("--encoder", choices=["ivfpq", "ivfsq8"], default="ivfpq",
+                        help="Vector encoding: product quantization (default) or INT8 scalar quantization")
+    args = parser.parse_args()
+
     print("=" * 68)
     print("NYC Taxi Demo Data Preparation")
     print("=" * 68)
@@ -210,7 +263,7 @@ def main():
     try:
         demo_file = download_sample()
         embeddings = generate_embeddings(demo_file)
-        build_faiss_index(embeddings)
+        build_faiss_index(embeddings, encoder=args.encoder)
 
         print()
         print("=" * 68)
@@ -0,0 +1,110 @@
+"""
+Request Micro-Batching
+Coalesces single-item requests arriving concurrently on gRPC worker threads
+into one batched call, so e.g. N single-text embeddings cost ~N/32 forward
+passes instead of N.
+
+The Docker image compiles this module with mypyc. Compiled code enforces the
+type annotations at runtime, so keep them accurate.
+"""
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError
+from typing import Any, Callable, List, Sequence
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """
+    Collects items submitted from any thread and processes them in batches on
+    a background worker thread.
+
+    The worker blocks for the first item, then keeps draining the queue until
+    max_batch_size items are collected or max_wait seconds have passed, and
+    calls process_batch(items) once for the whole batch. process_batch must
+    return one result per item, in order.
+    """
+
+    def __init__(self, process_batch: Callable[[List[Any]], Sequence[Any]], max_batch_size: int = 32,
+                 max_wait: float = 0.005, name: str = "micro-batcher"):
+        """
+        Start the batching worker thread.
+
+        Args:
+            process_batch: Function mapping a list of items to a sequence of results
+            max_batch_size: Most items handed to process_batch at once
+            max_wait: Seconds to wait for more items after the first one arrives
+            name: Worker thread name (shows up in logs and thread dumps)
+        """
+        self.process_batch = process_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._queue: "queue.Queue" = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name=name, daemon=True)
+        self._worker.start()
+
+    def submit(self, item: Any) -> Future:
+        """
+        Queue an item for the next batch.
+
+        Returns:
+            Future resolved with the item's result (or the batch's exception)
+        """
+        future: Future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def _collect(self) -> list:
+        """Block for one queued request, then gather more until the batch is full or max_wait expires."""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                self._process(batch)
+            except Exception as e:
+                # Never let one batch end the worker: every later submit() would hang
+                logger.exception(f"Unexpected error while resolving a batch of {len(batch)} items")
+                for _, future in batch:
+                    if not future.done():
+                        try:
+                            future.set_exception(e)
+                        except InvalidStateError:  # cancelled in the meantime
+                            pass
+
+    def _process(self, batch: list):
+        """Run process_batch over the batch's live futures and resolve each one."""
+        # Skip items whose caller already gave up; the rest can no longer be cancelled
+        batch = [(item, future) for item, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+
+        try:
+            results = self.process_batch([item for item, _ in batch])
+        except Exception as e:
+            logger.error(f"Batch of {len(batch)} items failed: {str(e)}", exc_info=True)
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+        if len(results) != len(batch):
+            error = RuntimeError(f"process_batch returned {len(results)} results for {len(batch)} items")
+            logger.error(str(error))
+            for _, future in batch[len(results):]:
+                future.set_exception(error)
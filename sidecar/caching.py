@@ -0,0 +1,68 @@
+"""
+LRU Caching
+Thread-safe least-recently-used cache shared by the sidecar's result caches
+(text → embedding, search key → results) and the Spark job's per-worker
+embedding cache. The hit rate is logged periodically so the cache size can
+be tuned from production logs.
+"""
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Log the hit rate every this many lookups
+CACHE_LOG_INTERVAL = 10000
+
+
+class LRUCache:
+    """
+    Thread-safe LRU cache mapping hashable keys to values (None is not a
+    storable value). A maxsize of 0 disables caching.
+    """
+
+    def __init__(self, maxsize: int, name: str = "LRU", log_interval: int = CACHE_LOG_INTERVAL):
+        """
+        Args:
+            maxsize: Most entries kept; the least recently used are evicted beyond it
+            name: Cache name used in the hit rate log line (e.g. "Embedding")
+            log_interval: Log the hit rate every this many lookups (0 = never)
+        """
+        self.maxsize = maxsize
+        self.name = name
+        self.log_interval = log_interval
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value for key (marking it recently used), or None."""
+        if self.maxsize <= 0:
+            return None
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._entries.move_to_end(key)
+            lookups = self.hits + self.misses
+            if self.log_interval > 0 and lookups % self.log_interval == 0:
+                logger.info(f"{self.name} cache: {self.hits / lookups:.1%} hit rate over {lookups} lookups, "
+                            f"{len(self._entries)} entries")
+        return value
+
+    def put(self, key: Hashable, value: Any):
+        """Store a value, evicting the least recently used entries beyond maxsize."""
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
@@ -2,12 +2,28 @@
 Embedding Service Implementation
 Generates semantic embeddings using sentence-transformers (all-MiniLM-L6-v2).
 Supports single and batch embedding generation.
+
+On hosts with CUDA the PyTorch model runs on the GPU in FP16.
+
+An optional ONNX Runtime backend runs a dynamically INT8-quantized export of
+the same model (see scripts/export_onnx_model.py) for ~2x CPU throughput.
+
+Embeddings are memoized per text in an in-process LRU cache, so duplicate
+texts (common for bucketed taxi-trip descriptions) skip the model entirely.
+Concurrent single-text requests are coalesced into micro-batches of up to 32.
 """
+import asyncio
 import logging
+import os
+from typing import List, Optional, Union
 import grpc
+import numpy as np
+import torch
 from sentence_transformers import SentenceTransformer
 import vector_service_pb2
 import vector_service_pb2_grpc
+from batching import MicroBatcher
+from caching import LRUCache
 
 logging.basicConfig(
     level=logging.INFO,
@@ -15,6 +31,76 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Texts per forward pass when encoding a batch on the PyTorch backend
+ENCODE_BATCH_SIZE = 64
+
+# Concurrent GenerateEmbedding calls are coalesced into batches of up to this
+# many texts, waiting at most EMBED_MICRO_BATCH_WAIT seconds for company
+EMBED_MICRO_BATCH_SIZE = 32
+EMBED_MICRO_BATCH_WAIT = 0.005
+
+
+class OnnxEmbeddingModel:
+    """
+    Sentence embedding model backed by an ONNX Runtime session.
+    Mirrors the subset of the SentenceTransformer API used by the service:
+    tokenize → transformer forward pass → mean pooling → L2 normalization.
+    """
+
+    def __init__(self, model_dir: str, model_file: str = "model_int8.onnx", max_seq_length: int = 256):
+        """
+        Load the ONNX model and its tokenizer.
+
+        Args:
+            model_dir: Directory written by scripts/export_onnx_model.py
+            model_file: ONNX file inside model_dir (INT8-quantized by default)
+            max_seq_length: Token limit per text (256 matches all-MiniLM-L6-v2)
+        """
+        # Imported lazily so the default sentence-transformers backend does not
+        # require onnxruntime to be installed.
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        model_path = os.path.join(model_dir, model_file)
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"ONNX model not found: {model_path}")
+
+        self.session = ort.InferenceSession(model_path, providers=["CPUExecutionProvider"])
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.max_seq_length = max_seq_length
+        self._input_names = {i.name for i in self.session.get_inputs()}
+        self._dimension = self.session.get_outputs()[0].shape[-1]
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self._dimension
+
+    def encode(self, sentences: Union[str, List[str]], convert_to_numpy: bool = True,
+               show_progress_bar: bool = False) -> np.ndarray:
+        """
+        Encode one text or a list of texts into L2-normalized FP32 embeddings.
+
+        Returns:
+            Array of shape [dimension] for a single string, else [n, dimension]
+        """
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+
+        tokens = self.tokenizer(
+            texts, padding=True, truncation=True, max_length=self.max_seq_length, return_tensors="np"
+        )
+        inputs = {name: tokens[name].astype(np.int64) for name in self._input_names}
+        token_embeddings = self.session.run(None, inputs)[0]
+
+        # Mean pooling over non-padding tokens, then L2 normalization
+        mask = tokens["attention_mask"][..., np.newaxis].astype(np.float32)
+        summed = (token_embeddings * mask).sum(axis=1)
+        counts = np.clip(mask.sum(axis=1), 1e-9, None)
+        embeddings = summed / counts
+        norms = np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+        embeddings = (embeddings / norms).astype(np.float32)
+
+        return embeddings[0] if single else embeddings
+
 
 class EmbeddingServiceImpl(vector_service_pb2_grpc.EmbeddingServiceServicer):
     """
@@ -22,20 +108,79 @@ class EmbeddingServiceImpl(vector_service_pb2_grpc.EmbeddingServiceServicer):
     Loads sentence-transformers model on initialization and caches it in memory.
     """
 
-    def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
+    def __init__(self, model_name: str = "all-MiniLM-L6-v2", onnx_model_dir: Optional[str] = None,
+                 cache_size: int = 65536):
         """
         Initialize the embedding service with a sentence-transformers model.
 
         Args:
             model_name: HuggingFace model identifier (default: all-MiniLM-L6-v2)
+            onnx_model_dir: Optional directory with an ONNX export of the model;
+                when set, inference runs on ONNX Runtime instead of PyTorch
+            cache_size: Max texts kept in the embedding LRU cache (0 disables it)
         """
-        logger.info(f"Loading embedding model: {model_name}")
-        self.model = SentenceTransformer(model_name)
+        if onnx_model_dir:
+            logger.info(f"Loading ONNX embedding model: {model_name} from {onnx_model_dir}")
+            self.model = OnnxEmbeddingModel(onnx_model_dir)
+            self.device = "cpu"
+        else:
+            self.device = "cuda" if torch.cuda.is_available() else "cpu"
+            logger.info(f"Loading embedding model: {model_name} on {self.device}")
+            self.model = SentenceTransformer(model_name, device=self.device)
+            if self.device == "cuda":
+                # FP16 weights use the GPU tensor cores; outputs are cast back to FP32
+                self.model = self.model.half()
         self.model_name = model_name
-        dim = self.model.get_sentence_embedding_dimension()
-        logger.info(f"Model {model_name} loaded successfully. Embedding dimension: {dim}")
+        self.dimension = self.model.get_sentence_embedding_dimension()
+        self.cache = LRUCache(maxsize=cache_size, name="Embedding")
+        self.batcher = MicroBatcher(
+            self._embed_cached,
+            max_batch_size=EMBED_MICRO_BATCH_SIZE,
+            max_wait=EMBED_MICRO_BATCH_WAIT,
+            name="embedding-batcher"
+        )
+        logger.info(f"Model {model_name} loaded successfully. Embedding dimension: {self.dimension}")
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        """
+        Encode a list of texts into an FP32 matrix of shape [n, dimension].
+        """
+        if self.device == "cuda":
+            # Keep the result on the GPU until the end and copy it back in one shot
+            embeddings = self.model.encode(
+                texts,
+                batch_size=ENCODE_BATCH_SIZE,
+                convert_to_numpy=False,
+                convert_to_tensor=True,
+                normalize_embeddings=True,
+                show_progress_bar=False
+            )
+            return embeddings.float().cpu().numpy()
+
+        return self.model.encode(texts, convert_to_numpy=True, show_progress_bar=False)
 
-    def GenerateEmbedding(self, request, context):
+    def _embed_cached(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed texts through the LRU cache: only unique cache misses reach the
+        model, and results are reassembled in the original order.
+        """
+        cached = [self.cache.get(text) for text in texts]
+        misses = list(dict.fromkeys(text for text, emb in zip(texts, cached) if emb is None))
+
+        fresh = {}
+        if misses:
+            encoded = self._encode_batch(misses)
+            for text, embedding in zip(misses, encoded):
+                # Copy the row so a cached entry does not pin the whole batch matrix
+                fresh[text] = np.array(embedding, dtype=np.float32)
+                self.cache.put(text, fresh[text])
+
+        embeddings = np.empty((len(texts), self.dimension), dtype=np.float32)
+        for i, (text, embedding) in enumerate(zip(texts, cached)):
+            embeddings[i] = fresh[text] if embedding is None else embedding
+        return embeddings
+
+    async def GenerateEmbedding(self, request, context):
         """
         Generate embedding for a single text input.
 
@@ -53,15 +198,17 @@ class EmbeddingServiceImpl(vector_service_pb2_grpc.EmbeddingServiceServicer):
                 context.set_details("Text cannot be empty")
                 return vector_service_pb2.EmbeddingResponse()
 
-            logger.debug(f"Generating embedding for text: '{text[:50]}...'")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Generating embedding for text: '%s...'", text[:50])
 
-            # Generate embedding (returns numpy array)
-            embedding = self.model.encode(text, convert_to_numpy=True)
+            # Generate embedding (returns numpy array); the text is encoded together
+            # with other concurrent single-text requests, or served from the cache
+            embedding = await asyncio.wrap_future(self.batcher.submit(text))
 
             # Convert to list of floats for protobuf
             vector = embedding.tolist()
 
-            logger.debug(f"Generated embedding with dimension: {len(vector)}")
+            logger.debug("Generated embedding with dimension: %d", len(vector))
 
             return vector_service_pb2.EmbeddingResponse(
                 vector=vector,
@@ -81,11 +228,12 @@ class EmbeddingServiceImpl(vector_service_pb2_grpc.EmbeddingServiceServicer):
         More efficient than multiple single requests due to batched inference.
 
         Args:
-            request: EmbeddingBatchRequest with list of texts
+            request: EmbeddingBatchRequest with list of texts (packed=True for bytes output)
             context: gRPC context
 
         Returns:
-            EmbeddingBatchResponse with list of embeddings
+            EmbeddingBatchResponse with list of embeddings, or a single packed
+            float32 matrix when request.packed is set (row i is request.texts[i])
         """
         try:
             texts = [t.strip() for t in request.texts if t.strip()]
@@ -95,10 +243,27 @@ class EmbeddingServiceImpl(vector_service_pb2_grpc.EmbeddingServiceServicer):
                 context.set_details("At least one non-empty text is required")
                 return vector_service_pb2.EmbeddingBatchResponse()
 
+            if request.packed and len(texts) != len(request.texts):
+                # Packed rows are matched to request.texts by position, so
+                # dropping blank texts would shift every later row
+                context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+                context.set_details("Blank texts are not allowed in a packed batch request")
+                return vector_service_pb2.EmbeddingBatchResponse()
+
             logger.info(f"Generating batch embeddings for {len(texts)} texts")
 
-            # Batch encode for efficiency
-            embeddings = self.model.encode(texts, convert_to_numpy=True, show_progress_bar=False)
+            # Batch encode for efficiency (cache misses only)
+            embeddings = self._embed_cached(texts)
+
+            if request.packed:
+                # Ship the whole batch as one contiguous float32 buffer — avoids
+                # N·d Python floats and per-float protobuf encoding.
+                matrix = np.ascontiguousarray(embeddings, dtype=np.float32)
+                logger.info(f"Successfully generated {matrix.shape[0]} embeddings (packed)")
+                return vector_service_pb2.EmbeddingBatchResponse(
+                    packed_matrix=matrix.tobytes(),
+                    dimension=matrix.shape[1]
+                )
 
             # Convert numpy arrays to EmbeddingResponse messages
             responses = []
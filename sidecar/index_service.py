@@ -2,16 +2,50 @@
 Index Service Implementation
 Manages FAISS IVF-PQ indexes for approximate nearest neighbor search.
 Supports multi-shard indexing, hot reloading, and configurable search parameters.
+
+Concurrent SearchIndex calls on a shard are coalesced into one batched FAISS
+search, which FAISS parallelizes across queries (a single query runs on one
+thread).
+
+With use_gpu (USE_GPU=1) and a GPU-enabled FAISS build, shards are copied to
+GPU memory with index_cpu_to_gpu, spread round-robin over the visible GPUs.
+Indexes the GPU cloner cannot handle (e.g. IVF-PQ FastScan) stay on CPU.
+
+CPU shards are opened with IO_FLAG_MMAP | IO_FLAG_READ_ONLY: the inverted
+lists of IVF-PQ / IVF-SQ indexes are mapped from the file, so only touched
+pages are resident and replicas on one host share them via the page cache.
+
+With watch=True (and the optional watchdog package installed) the index
+directory is watched: a *.index file that is renamed into place or finishes
+being written is hot-reloaded, or loaded as a new shard, without a
+ReloadIndex RPC.
+
+Recent results are kept in an LRU cache keyed by the exact query bytes,
+top_k and nprobe, so repeated queries (popular searches, client retries)
+skip FAISS. Entries are tagged with the shard's reload generation, so a
+reloaded shard never serves results from its previous index.
 """
+import asyncio
 import logging
 import os
 import threading
-from typing import Dict
+from concurrent.futures import Future, ThreadPoolExecutor
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional, Tuple
 import grpc
 import faiss
 import numpy as np
 import vector_service_pb2
 import vector_service_pb2_grpc
+from batching import MicroBatcher
+from caching import LRUCache
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # optional: automatic reload needs watchdog
+    FileSystemEventHandler = object  # type: ignore[misc,assignment]
+    Observer = None  # type: ignore[assignment]
 
 logging.basicConfig(
     level=logging.INFO,
@@ -19,6 +53,56 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Concurrent searches on one shard are batched up to SEARCH_MAX_BATCH queries,
+# waiting at most SEARCH_MAX_WAIT seconds (500µs) after the first one
+SEARCH_MAX_BATCH = 64
+SEARCH_MAX_WAIT = 0.0005
+
+# Map IVF inverted lists from the index file instead of copying them to the heap.
+# Indexes without mmap-able lists (flat, FastScan) are read into RAM as before.
+INDEX_READ_FLAGS = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+
+# Responses for top_k up to this are sent uncompressed even when the server
+# compresses by default: ~100 bytes gain nothing and compression costs latency
+UNCOMPRESSED_MAX_TOP_K = 10
+
+# Shard files read concurrently at startup (bounded by disk parallelism)
+SHARD_LOAD_WORKERS = 8
+
+# One StandardGpuResources (scratch memory, streams) per GPU, shared by shards
+_gpu_resources: Dict[int, "faiss.StandardGpuResources"] = {}
+_gpu_resources_lock = threading.Lock()
+
+
+def gpu_count() -> int:
+    """Number of GPUs usable by FAISS (0 for CPU-only builds)."""
+    if not hasattr(faiss, "StandardGpuResources"):
+        return 0
+    return faiss.get_num_gpus()
+
+
+def _index_to_gpu(cpu_index, device: int):
+    """Copy an index to a GPU, storing PQ lookup tables in FP16."""
+    with _gpu_resources_lock:
+        if device not in _gpu_resources:
+            _gpu_resources[device] = faiss.StandardGpuResources()
+        res = _gpu_resources[device]
+
+    co = faiss.GpuClonerOptions()
+    co.useFloat16 = True
+    co.usePrecomputed = False
+    return faiss.index_cpu_to_gpu(res, device, cpu_index, co)
+
+
+def _extract_ivf(index):
+    """IVF layer (CPU or GPU) whose nprobe drives the search, or None for flat indexes."""
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is None and hasattr(faiss, "GpuIndexIVF"):
+        inner = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexPreTransform) else index
+        if isinstance(inner, faiss.GpuIndexIVF):
+            ivf = inner
+    return ivf
+
 
 class ShardIndex:
     """
@@ -26,16 +110,21 @@ class ShardIndex:
     Encapsulates index metadata and provides search functionality.
     """
 
-    def __init__(self, shard_key: str, index_path: str):
+    def __init__(self, shard_key: str, index_path: str, gpu_device: Optional[int] = None,
+                 omp_threads: Optional[int] = None):
         """
         Load a FAISS index from disk.
 
         Args:
             shard_key: Unique identifier for this shard (e.g., "nyc_taxi_2023")
             index_path: Filesystem path to the .index file
+            gpu_device: GPU to serve this shard from (None = CPU)
+            omp_threads: Most OpenMP threads one search may use (default: OpenMP's max)
         """
         self.shard_key = shard_key
         self.index_path = index_path
+        self.gpu_device = gpu_device
+        self.omp_threads = omp_threads or faiss.omp_get_max_threads()
         # Protects the index pointer swap during hot reload.
         # Lock scope is kept minimal: search() holds it only long enough to
         # capture a local reference; reload() holds it only for the pointer swap,
@@ -46,47 +135,154 @@ class ShardIndex:
             raise FileNotFoundError(f"Index file not found: {index_path}")
 
         logger.info(f"Loading FAISS index for shard '{shard_key}' from {index_path}")
-        self.index = faiss.read_index(index_path)
+        self.index = self._load_index()
+        # IVF layer (for nprobe), possibly nested inside an IndexPreTransform; None for flat indexes
+        self.ivf = _extract_ivf(self.index)
         self.dimension = self.index.d
         self.total_vectors = self.index.ntotal
+        # Last nprobe written to self.ivf, so repeat searches skip the SWIG setter
+        self._nprobe: Optional[int] = None
+        # Bumped on every reload; search cache entries from older generations are never hit
+        self.generation = 0
+        # Reused (SEARCH_MAX_BATCH, d) query matrix and flat distance/id output
+        # buffers (grown to the largest k seen); only the batcher thread touches them
+        self._query_buf = np.empty((SEARCH_MAX_BATCH, self.dimension), dtype=np.float32)
+        self._distances_buf = np.empty(0, dtype=np.float32)
+        self._ids_buf = np.empty(0, dtype=np.int64)
+
+        # Single worker thread per shard that runs queued searches as batches
+        self._batcher = MicroBatcher(
+            self._search_requests,
+            max_batch_size=SEARCH_MAX_BATCH,
+            max_wait=SEARCH_MAX_WAIT,
+            name=f"search-batcher-{shard_key}"
+        )
 
         logger.info(f"Shard '{shard_key}' loaded: {self.total_vectors} vectors, dimension={self.dimension}")
 
+    def _load_index(self):
+        """
+        Read (memory-map) the index file and, if this shard has a GPU assigned,
+        copy it to that GPU. Falls back to the CPU index if the GPU copy fails.
+        """
+        index = faiss.read_index(self.index_path, INDEX_READ_FLAGS)
+        if self.gpu_device is None:
+            return index
+
+        try:
+            gpu_index = _index_to_gpu(index, self.gpu_device)
+            logger.info(f"Shard '{self.shard_key}' moved to GPU {self.gpu_device}")
+            return gpu_index
+        except Exception as e:
+            logger.warning(f"Shard '{self.shard_key}' cannot run on GPU {self.gpu_device}, using CPU: {e}")
+            return index
+
     def search(self, query_vector: np.ndarray, top_k: int, nprobe: int) -> tuple:
         """
         Perform approximate nearest neighbor search.
 
+        Args:
+            query_vector: Query embedding (numpy array of shape [dimension])
+            top_k: Number of nearest neighbors to return
+            nprobe: Number of IVF cells to probe (higher = more accurate but slower)
+
+        Returns:
+            Tuple of (distances, indices) - both numpy arrays of shape [top_k]
+        """
+        # Ensure query is 2D for FAISS (shape: [1, dimension])
+        distances, indices = self.search_batch(query_vector.reshape(1, -1), top_k, nprobe)
+
+        # Return flattened results (remove batch dimension)
+        return distances[0], indices[0]
+
+    def search_batch(self, queries: np.ndarray, top_k: int, nprobe: int,
+                     distances: Optional[np.ndarray] = None, indices: Optional[np.ndarray] = None) -> tuple:
+        """
+        Search several queries with one FAISS call.
+
         Thread safety: acquires _lock briefly to snapshot the index reference,
         then releases before the (potentially slow) FAISS search. This ensures
         we always operate on a consistent index object even if a reload happens
         concurrently.
 
         Args:
-            query_vector: Query embedding (numpy array of shape [dimension])
-            top_k: Number of nearest neighbors to return
-            nprobe: Number of IVF cells to probe (higher = more accurate but slower)
+            queries: Query embeddings (numpy array of shape [n_queries, dimension])
+            top_k: Number of nearest neighbors to return per query
+            nprobe: Number of IVF cells to probe
+            distances, indices: Optional preallocated C-contiguous [n_queries, top_k]
+                float32 / int64 arrays FAISS writes the results into
 
         Returns:
-            Tuple of (distances, indices) - both numpy arrays of shape [top_k]
+            Tuple of (distances, indices) - both numpy arrays of shape [n_queries, top_k]
         """
         # Snapshot the index reference under the lock so a concurrent reload
         # cannot change self.index between our nprobe set and .search() call.
         with self._lock:
-            index = self.index
+            index, ivf, current_nprobe = self.index, self.ivf, self._nprobe
 
-        # Ensure query is 2D for FAISS (shape: [1, dimension])
-        if query_vector.ndim == 1:
-            query_vector = query_vector.reshape(1, -1)
+        # Set nprobe parameter for IVF index (only when it changes)
+        if ivf is not None and nprobe != current_nprobe:
+            ivf.nprobe = nprobe
+            with self._lock:
+                if self.ivf is ivf:
+                    self._nprobe = nprobe
 
-        # Set nprobe parameter for IVF index
-        if hasattr(index, 'nprobe'):
-            index.nprobe = nprobe
+        # FAISS parallelizes over queries, so threads beyond the batch size only
+        # add fork/join overhead (a single query runs on one thread). The OpenMP
+        # thread count is per calling thread, so this cannot affect other shards.
+        faiss.omp_set_num_threads(min(len(queries), self.omp_threads))
 
         # FAISS search returns (distances, indices)
-        distances, indices = index.search(query_vector, top_k)
+        return index.search(queries, top_k, D=distances, I=indices)
 
-        # Return flattened results (remove batch dimension)
-        return distances[0], indices[0]
+    def submit_search(self, query_vector: np.ndarray, top_k: int, nprobe: int) -> Future:
+        """
+        Queue a search to run batched with other concurrent searches on this shard.
+
+        Returns:
+            Future resolving to (distances, indices) as Python lists of length top_k,
+            ready to go into a SearchResponse
+        """
+        return self._batcher.submit((query_vector, top_k, nprobe))
+
+    def _search_requests(self, requests: List[Tuple[np.ndarray, int, int]]) -> list:
+        """
+        Run queued (query_vector, top_k, nprobe) requests: one FAISS call per
+        distinct nprobe, retrieving the largest top_k and trimming per request.
+
+        FAISS writes into the shard's reused output buffers, and each request's
+        rows are converted to lists here, on the worker thread, so the handler
+        only copies them into the response.
+        """
+        results: List[Optional[Tuple[List[float], List[int]]]] = [None] * len(requests)
+        by_nprobe: Dict[int, List[int]] = {}
+        for i, (_, _, nprobe) in enumerate(requests):
+            by_nprobe.setdefault(nprobe, []).append(i)
+
+        # Reallocate only if a reload changed the dimension
+        if self._query_buf.shape[1] != self.dimension:
+            self._query_buf = np.empty((SEARCH_MAX_BATCH, self.dimension), dtype=np.float32)
+
+        for nprobe, positions in by_nprobe.items():
+            # Copy the group's queries into the contiguous float32 buffer FAISS reads directly
+            queries = self._query_buf[:len(positions)]
+            for row, i in enumerate(positions):
+                queries[row] = requests[i][0]
+            k = max(requests[i][1] for i in positions)
+            size = len(positions) * k
+            if self._ids_buf.shape[0] < SEARCH_MAX_BATCH * k:
+                self._distances_buf = np.empty(SEARCH_MAX_BATCH * k, dtype=np.float32)
+                self._ids_buf = np.empty(SEARCH_MAX_BATCH * k, dtype=np.int64)
+            distances, indices = self.search_batch(
+                queries, k, nprobe,
+                distances=self._distances_buf[:size].reshape(-1, k),
+                indices=self._ids_buf[:size].reshape(-1, k)
+            )
+            for row, i in enumerate(positions):
+                top_k = requests[i][1]
+                results[i] = (distances[row, :top_k].tolist(), indices[row, :top_k].tolist())
+
+        return results
 
     def reload(self) -> bool:
         """
@@ -101,10 +297,13 @@ class ShardIndex:
         try:
             logger.info(f"Reloading index for shard '{self.shard_key}'")
             # Load new index outside the lock — disk I/O can be slow
-            new_index = faiss.read_index(self.index_path)
+            new_index = self._load_index()
             # Atomic pointer swap — searches blocked only for this instant
             with self._lock:
                 self.index = new_index
+                self.ivf = _extract_ivf(new_index)
+                self._nprobe = None
+                self.generation += 1
                 self.dimension = self.index.d
                 self.total_vectors = self.index.ntotal
             logger.info(f"Shard '{self.shard_key}' reloaded: {self.total_vectors} vectors")
@@ -114,27 +313,110 @@ class ShardIndex:
             return False
 
 
+class _IndexDirHandler(FileSystemEventHandler):
+    """Forwards *.index files renamed into place or closed after writing."""
+
+    def __init__(self, on_index_file):
+        super().__init__()
+        self.on_index_file = on_index_file
+
+    def on_moved(self, event):
+        if not event.is_directory and event.dest_path.endswith('.index'):
+            self.on_index_file(event.dest_path)
+
+    def on_closed(self, event):
+        if not event.is_directory and event.src_path.endswith('.index'):
+            self.on_index_file(event.src_path)
+
+
 class IndexServiceImpl(vector_service_pb2_grpc.IndexServiceServicer):
     """
     Implements the IndexService gRPC service.
     Manages multiple FAISS index shards and handles search requests.
     """
 
-    def __init__(self, index_dir: str = "/data/indexes"):
+    def __init__(self, index_dir: str = "/data/indexes", use_gpu: bool = False, watch: bool = False,
+                 omp_threads: Optional[int] = None, cache_size: int = 10000):
         """
         Initialize the index service.
 
         Args:
             index_dir: Directory containing .index files (one per shard)
+            use_gpu: Serve shards from GPU memory when FAISS has GPU support
+            watch: Hot-reload shards when their .index files are replaced (needs watchdog)
+            omp_threads: Most OpenMP threads one FAISS search may use (default: OpenMP's max)
+            cache_size: Max results kept in the search result LRU cache (0 disables it)
         """
         self.index_dir = index_dir
-        self.shards: Dict[str, ShardIndex] = {}
+        self.num_gpus = gpu_count() if use_gpu else 0
+        if use_gpu and self.num_gpus == 0:
+            logger.warning("GPU search requested but FAISS has no usable GPU; serving shards from CPU")
+        # Read-only view, replaced wholesale (copy-on-write) when shards are
+        # added, so request handlers can read it without locking
+        self.shards: Mapping[str, ShardIndex] = MappingProxyType({})
+        # Serializes shard reloads/additions (ReloadIndex RPC vs. directory watcher)
+        self._shards_lock = threading.RLock()
+        self._observer: Optional[Any] = None  # watchdog Observer
+        self.cache = LRUCache(maxsize=cache_size, name="Search")
+        # GetIndexInfo response, rebuilt whenever a shard is loaded or reloaded
+        self._index_info = vector_service_pb2.IndexInfoResponse()
+        self.omp_threads = omp_threads or faiss.omp_get_max_threads()
+        logger.info(f"FAISS OpenMP threads per search: up to {self.omp_threads}")
         self._load_all_shards()
+        if watch:
+            self._start_watching()
+
+    def _start_watching(self):
+        """Watch index_dir for published .index files (atomic rename or finished write)."""
+        if Observer is None:
+            logger.warning("watchdog is not installed; index auto-reload is disabled")
+            return
+
+        self._observer = Observer()
+        self._observer.daemon = True
+        self._observer.schedule(_IndexDirHandler(self._on_index_file), self.index_dir, recursive=False)
+        self._observer.start()
+        logger.info(f"Watching {self.index_dir} for index updates")
+
+    def _on_index_file(self, index_path: str):
+        """Reload the shard backed by index_path, or load it as a new shard."""
+        shard_key = os.path.basename(index_path)[:-len('.index')]
+        with self._shards_lock:
+            shard = self.shards.get(shard_key)
+            if shard is not None:
+                shard.reload()
+                self._refresh_index_info()
+                return
+
+            gpu_device = len(self.shards) % self.num_gpus if self.num_gpus else None
+            try:
+                shard = ShardIndex(shard_key, index_path, gpu_device=gpu_device, omp_threads=self.omp_threads)
+                self.shards = MappingProxyType({**self.shards, shard_key: shard})
+                self._refresh_index_info()
+                logger.info(f"Added new shard '{shard_key}' from {index_path}")
+            except Exception as e:
+                logger.error(f"Failed to load shard '{shard_key}': {e}")
+
+    def _load_one_shard(self, i: int, filename: str) -> Optional[Tuple[str, ShardIndex]]:
+        """Load the i-th index file as a shard; returns (shard_key, shard), or None on failure."""
+        shard_key = filename.replace('.index', '')
+        index_path = os.path.join(self.index_dir, filename)
+        # Spread shards round-robin over the GPUs
+        gpu_device = i % self.num_gpus if self.num_gpus else None
+        try:
+            return shard_key, ShardIndex(shard_key, index_path, gpu_device=gpu_device, omp_threads=self.omp_threads)
+        except Exception as e:
+            logger.error(f"Failed to load shard '{shard_key}': {e}")
+            return None
 
     def _load_all_shards(self):
         """
         Discover and load all .index files in the index directory.
         Each filename (without extension) becomes a shard key.
+
+        Files are memory-mapped, so index builders must replace them atomically
+        (write a temp file, then rename) rather than rewrite them in place —
+        truncating a mapped file crashes readers with SIGBUS.
         """
         if not os.path.exists(self.index_dir):
             logger.warning(f"Index directory does not exist: {self.index_dir}. Creating it.")
@@ -147,39 +429,64 @@ class IndexServiceImpl(vector_service_pb2_grpc.IndexServiceServicer):
             logger.warning(f"No .index files found in {self.index_dir}")
             return
 
-        for filename in index_files:
-            shard_key = filename.replace('.index', '')
-            index_path = os.path.join(self.index_dir, filename)
-            try:
-                self.shards[shard_key] = ShardIndex(shard_key, index_path)
-            except Exception as e:
-                logger.error(f"Failed to load shard '{shard_key}': {e}")
+        # Shards are independent and read_index releases the GIL, so load them
+        # in parallel: cold start takes max(t_i) rather than sum(t_i)
+        with ThreadPoolExecutor(max_workers=min(SHARD_LOAD_WORKERS, len(index_files))) as executor:
+            loaded = list(executor.map(self._load_one_shard, range(len(index_files)), index_files))
 
+        self.shards = MappingProxyType(dict(shard for shard in loaded if shard is not None))
+        self._refresh_index_info()
         logger.info(f"Loaded {len(self.shards)} shard(s): {list(self.shards.keys())}")
 
-    def SearchIndex(self, request, context):
+    def _refresh_index_info(self):
+        """
+        Rebuild the cached GetIndexInfo response from the current shards.
+        Called (under _shards_lock, or during __init__) after every load/reload.
+        """
+        self._index_info = vector_service_pb2.IndexInfoResponse(shards=[
+            vector_service_pb2.ShardInfo(
+                shard_key=shard_key,
+                total_vectors=shard.total_vectors,
+                dimension=shard.dimension,
+                index_path=shard.index_path
+            )
+            for shard_key, shard in self.shards.items()
+        ])
+
+    async def SearchIndex(self, request, context):
         """
         Search a FAISS index shard with a query vector.
 
         Args:
-            request: SearchRequest with shard_key, query_vector, top_k, nprobe
+            request: SearchRequest with shard_key, query_vector (or query_vector_packed), top_k, nprobe
             context: gRPC context
 
         Returns:
-            SearchResponse with distances and indices
+            SearchResponse with parallel ids and scores (L2 distances)
         """
         try:
             shard_key = request.shard_key or "nyc_taxi_2023"  # Default shard
 
-            if shard_key not in self.shards:
+            # One read of the current shard map; no lock needed (it is never mutated)
+            shards = self.shards
+            shard = shards.get(shard_key)
+            if shard is None:
                 context.set_code(grpc.StatusCode.NOT_FOUND)
-                context.set_details(f"Shard '{shard_key}' not found. Available shards: {list(self.shards.keys())}")
+                context.set_details(f"Shard '{shard_key}' not found. Available shards: {list(shards.keys())}")
                 return vector_service_pb2.SearchResponse()
 
-            shard = self.shards[shard_key]
-
-            # Convert repeated float field to numpy array
-            query_vector = np.array(request.query_vector, dtype=np.float32)
+            if request.query_vector_packed:
+                # Packed float32 bytes: zero-copy view, no per-element boxing
+                if len(request.query_vector_packed) % 4:
+                    context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+                    context.set_details("query_vector_packed length must be a multiple of 4 bytes (float32)")
+                    return vector_service_pb2.SearchResponse()
+                query_vector = np.frombuffer(request.query_vector_packed, dtype=np.float32)
+                query_bytes = request.query_vector_packed
+            else:
+                # Convert repeated float field to numpy array
+                query_vector = np.fromiter(request.query_vector, dtype=np.float32, count=len(request.query_vector))
+                query_bytes = query_vector.tobytes()
 
             if query_vector.shape[0] != shard.dimension:
                 context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
@@ -191,26 +498,31 @@ class IndexServiceImpl(vector_service_pb2_grpc.IndexServiceServicer):
             top_k = request.top_k if request.top_k > 0 else 10
             nprobe = request.nprobe if request.nprobe > 0 else 10
 
-            logger.debug(f"Searching shard '{shard_key}' with top_k={top_k}, nprobe={nprobe}")
-
-            distances, indices = shard.search(query_vector, top_k, nprobe)
-
-            # Convert numpy results to SearchResult messages
-            results = []
-            for idx, (distance, doc_id) in enumerate(zip(distances, indices)):
-                result = vector_service_pb2.SearchResult(
-                    id=int(doc_id),
-                    score=float(distance),
-                    metadata_json=""  # No metadata in this simple implementation
-                )
-                results.append(result)
+            # Exact-repeat queries only: the key is the raw float32 bytes
+            cache_key = (shard_key, shard.generation, query_bytes, top_k, nprobe)
+            cached = self.cache.get(cache_key)
+            if cached is None:
+                # Lazy %-formatting: nothing is formatted unless DEBUG is enabled
+                logger.debug("Searching shard '%s' with top_k=%d, nprobe=%d", shard_key, top_k, nprobe)
+
+                # Batched with concurrent searches on the same shard; the event loop
+                # keeps serving other RPCs while the shard's worker thread searches
+                scores, ids = await asyncio.wrap_future(shard.submit_search(query_vector, top_k, nprobe))
+                self.cache.put(cache_key, (ids, scores))
+            else:
+                ids, scores = cached
 
-            return vector_service_pb2.SearchResponse(
-                results=results,
+            # Packed parallel id/score arrays: no per-result message construction
+            response = vector_service_pb2.SearchResponse(
                 shard_key=shard_key,
                 search_latency_ms=0.0,  # Could add timing here
-                cache_hit=False
+                cache_hit=cached is not None
             )
+            response.ids.extend(ids)
+            response.scores.extend(scores)
+            if top_k <= UNCOMPRESSED_MAX_TOP_K:
+                context.disable_next_message_compression()
+            return response
 
         except Exception as e:
             logger.error(f"Error during search: {str(e)}", exc_info=True)
@@ -230,19 +542,10 @@ class IndexServiceImpl(vector_service_pb2_grpc.IndexServiceServicer):
             IndexInfoResponse with list of ShardInfo
         """
         try:
-            shard_infos = []
-            for shard_key, shard in self.shards.items():
-                shard_info = vector_service_pb2.ShardInfo(
-                    shard_key=shard_key,
-                    total_vectors=shard.total_vectors,
-                    dimension=shard.dimension,
-                    index_path=shard.index_path
-                )
-                shard_infos.append(shard_info)
-
-            logger.debug(f"Returning info for {len(shard_infos)} shards")
-
-            return vector_service_pb2.IndexInfoResponse(shards=shard_infos)
+            # Prebuilt on load/reload; never mutated after publication
+            index_info = self._index_info
+            logger.debug("Returning info for %d shards", len(index_info.shards))
+            return index_info
 
         except Exception as e:
             logger.error(f"Error getting index info: {str(e)}", exc_info=True)
@@ -282,7 +585,9 @@ class IndexServiceImpl(vector_service_pb2_grpc.IndexServiceServicer):
                     reloaded_shards=[]
                 )
 
-            success = self.shards[shard_key].reload()
+            with self._shards_lock:
+                success = self.shards[shard_key].reload()
+                self._refresh_index_info()
 
             if success:
                 return vector_service_pb2.ReloadIndexResponse(
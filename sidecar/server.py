@@ -2,16 +2,56 @@
 gRPC Server Entry Point
 Starts both EmbeddingService and IndexService on port 50051.
 Supports graceful shutdown via SIGTERM/SIGINT.
+
+Runs on grpc.aio: the hot single-item RPCs (SearchIndex, GenerateEmbedding)
+are coroutines awaiting their micro-batch workers, so concurrent requests
+are not capped by a handler thread pool. The remaining synchronous handlers
+run on a MAX_WORKERS thread pool.
+
+FAISS (and PyTorch) parallelize with OpenMP, which by default starts one
+thread per logical CPU of the host, SMT siblings and CPUs outside the
+container's affinity mask included. OMP_NUM_THREADS is therefore pinned to
+the physical cores this process may run on before either library is
+imported; the OpenMP runtime reads it once at load time, so the env var is
+the authoritative setting and an explicit OMP_NUM_THREADS always wins.
 """
+import asyncio
+import glob
 import logging
 import os
 import signal
 import sys
 from concurrent import futures
-import grpc
-from embedding_service import EmbeddingServiceImpl
-from index_service import IndexServiceImpl
-import vector_service_pb2_grpc
+
+
+def physical_cores() -> int:
+    """
+    Count the physical cores in this process's CPU affinity mask, folding SMT
+    siblings together via sysfs (falls back to the logical CPU count).
+    """
+    try:
+        cpus = os.sched_getaffinity(0)
+    except AttributeError:  # not Linux
+        return os.cpu_count() or 1
+
+    cores = set()
+    for cpu in cpus:
+        siblings = glob.glob(f'/sys/devices/system/cpu/cpu{cpu}/topology/thread_siblings_list')
+        if not siblings:
+            return len(cpus)
+        with open(siblings[0]) as f:
+            cores.add(f.read().strip())
+    return max(1, len(cores))
+
+
+PHYSICAL_CORES = physical_cores()
+os.environ.setdefault('OMP_NUM_THREADS', str(PHYSICAL_CORES))
+
+import grpc  # noqa: E402
+from google.protobuf.internal import api_implementation  # noqa: E402
+from embedding_service import EmbeddingServiceImpl  # noqa: E402
+from index_service import IndexServiceImpl  # noqa: E402
+import vector_service_pb2_grpc  # noqa: E402
 
 # Configure logging
 logging.basicConfig(
@@ -26,8 +66,25 @@ logger = logging.getLogger(__name__)
 # Configuration from environment variables
 GRPC_PORT = int(os.getenv('GRPC_PORT', '50051'))
 EMBEDDING_MODEL = os.getenv('EMBEDDING_MODEL', 'all-MiniLM-L6-v2')
+EMBEDDING_ONNX_DIR = os.getenv('EMBEDDING_ONNX_DIR', '')  # empty = PyTorch backend
+EMBEDDING_CACHE_SIZE = int(os.getenv('EMBEDDING_CACHE_SIZE', '65536'))  # 0 disables the cache
 INDEX_DIR = os.getenv('INDEX_DIR', '/data/indexes')
-MAX_WORKERS = int(os.getenv('MAX_WORKERS', '10'))
+SEARCH_CACHE_SIZE = int(os.getenv('SEARCH_CACHE_SIZE', '10000'))  # 0 disables the cache
+USE_GPU = os.getenv('USE_GPU', '0') == '1'  # serve FAISS shards from GPU (needs faiss-gpu)
+INDEX_AUTO_RELOAD = os.getenv('INDEX_AUTO_RELOAD', '1') == '1'  # reload shards when .index files change
+OMP_THREADS = int(os.environ['OMP_NUM_THREADS'])
+# Sync handlers only; kept small so they don't compete with FAISS's OpenMP threads
+MAX_WORKERS = int(os.getenv('MAX_WORKERS', str(max(1, min(4, PHYSICAL_CORES // 2)))))
+# Response compression: none (default) | gzip | deflate. Small search responses
+# (top_k <= 10) are always sent uncompressed; see IndexServiceImpl.SearchIndex
+GRPC_COMPRESSION = os.getenv('GRPC_COMPRESSION', 'none').lower()
+
+
+COMPRESSION_ALGORITHMS = {
+    'none': grpc.Compression.NoCompression,
+    'gzip': grpc.Compression.Gzip,
+    'deflate': grpc.Compression.Deflate,
+}
 
 
 def create_server():
@@ -37,9 +94,13 @@ def create_server():
     Returns:
         Configured gRPC server instance
     """
-    # Create thread pool for handling concurrent requests
-    server = grpc.server(
-        futures.ThreadPoolExecutor(max_workers=MAX_WORKERS),
+    if GRPC_COMPRESSION not in COMPRESSION_ALGORITHMS:
+        raise ValueError(f"GRPC_COMPRESSION must be one of {sorted(COMPRESSION_ALGORITHMS)}, got '{GRPC_COMPRESSION}'")
+
+    # Asyncio server; synchronous handlers run on the migration thread pool
+    server = grpc.aio.server(
+        migration_thread_pool=futures.ThreadPoolExecutor(max_workers=MAX_WORKERS),
+        compression=COMPRESSION_ALGORITHMS[GRPC_COMPRESSION],
         options=[
             ('grpc.max_send_message_length', 100 * 1024 * 1024),  # 100 MB
             ('grpc.max_receive_message_length', 100 * 1024 * 1024),  # 100 MB
@@ -52,11 +113,21 @@ def create_server():
 
     # Initialize and register services
     logger.info(f"Initializing EmbeddingService with model: {EMBEDDING_MODEL}")
-    embedding_service = EmbeddingServiceImpl(model_name=EMBEDDING_MODEL)
+    embedding_service = EmbeddingServiceImpl(
+        model_name=EMBEDDING_MODEL,
+        onnx_model_dir=EMBEDDING_ONNX_DIR or None,
+        cache_size=EMBEDDING_CACHE_SIZE
+    )
     vector_service_pb2_grpc.add_EmbeddingServiceServicer_to_server(embedding_service, server)
 
     logger.info(f"Initializing IndexService with index directory: {INDEX_DIR}")
-    index_service = IndexServiceImpl(index_dir=INDEX_DIR)
+    index_service = IndexServiceImpl(
+        index_dir=INDEX_DIR,
+        use_gpu=USE_GPU,
+        watch=INDEX_AUTO_RELOAD,
+        omp_threads=OMP_THREADS,
+        cache_size=SEARCH_CACHE_SIZE
+    )
     vector_service_pb2_grpc.add_IndexServiceServicer_to_server(index_service, server)
 
     # Bind to all interfaces on specified port
@@ -65,39 +136,50 @@ def create_server():
     return server
 
 
-def serve():
+async def serve():
     """
     Start the gRPC server and handle graceful shutdown.
     """
     server = create_server()
 
     # Graceful shutdown handler
-    def signal_handler(sig, frame):
+    def signal_handler():
         logger.info("Received shutdown signal, stopping server...")
-        server.stop(grace=5)  # 5 second grace period
-        sys.exit(0)
+        asyncio.ensure_future(server.stop(grace=5))  # 5 second grace period
 
-    signal.signal(signal.SIGINT, signal_handler)
-    signal.signal(signal.SIGTERM, signal_handler)
+    loop = asyncio.get_running_loop()
+    loop.add_signal_handler(signal.SIGINT, signal_handler)
+    loop.add_signal_handler(signal.SIGTERM, signal_handler)
 
     logger.info(f"Starting gRPC server on port {GRPC_PORT}")
     logger.info("Configuration:")
     logger.info(f"  - Embedding Model: {EMBEDDING_MODEL}")
+    backend = f"onnxruntime ({EMBEDDING_ONNX_DIR})" if EMBEDDING_ONNX_DIR else "pytorch"
+    logger.info(f"  - Embedding Backend: {backend}")
+    logger.info(f"  - Embedding Cache Size: {EMBEDDING_CACHE_SIZE}")
     logger.info(f"  - Index Directory: {INDEX_DIR}")
+    logger.info(f"  - Search Cache Size: {SEARCH_CACHE_SIZE}")
+    logger.info(f"  - GPU Search: {USE_GPU}")
+    logger.info(f"  - Index Auto-Reload: {INDEX_AUTO_RELOAD}")
     logger.info(f"  - Max Workers: {MAX_WORKERS}")
-
-    server.start()
+    logger.info(f"  - Response Compression: {GRPC_COMPRESSION}")
+    logger.info(f"  - Protobuf Runtime: {api_implementation.Type()}")
+    if api_implementation.Type() == 'python':
+        # protobuf 4.x ships the native upb runtime as wheels; the pure-Python
+        # fallback makes every message build and parse several times slower
+        logger.warning("Protobuf is using the pure-Python runtime; check PROTOCOL_BUFFERS_PYTHON_IMPLEMENTATION "
+                       "and that the protobuf wheel matches this platform")
+    logger.info(f"  - OpenMP Threads: {OMP_THREADS} ({PHYSICAL_CORES} physical cores available)")
+
+    await server.start()
     logger.info(f"gRPC server is listening on port {GRPC_PORT}")
 
-    try:
-        server.wait_for_termination()
-    except KeyboardInterrupt:
-        logger.info("Server interrupted by user")
-        server.stop(grace=5)
+    await server.wait_for_termination()
+    logger.info("Server stopped")
 
 
 if __name__ == '__main__':
     logger.info("=" * 60)
     logger.info("Vector Catalog Service - gRPC Sidecar")
     logger.info("=" * 60)
-    serve()
+    asyncio.run(serve())
@@ -0,0 +1,110 @@
+"""
+Unit tests for MicroBatcher
+Tests that concurrent submissions are coalesced and results routed back in order.
+"""
+import sys
+import os
+import threading
+
+# Add parent directory to path so we can import sidecar modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest  # noqa: E402
+from batching import MicroBatcher  # noqa: E402
+
+
+def test_micro_batcher_returns_results_in_order():
+    """Test that each future gets the result for its own item"""
+    batcher = MicroBatcher(lambda items: [x * 2 for x in items], max_batch_size=4, max_wait=0.05)
+
+    futures = [batcher.submit(i) for i in range(10)]
+
+    assert [f.result(timeout=5) for f in futures] == [i * 2 for i in range(10)]
+
+
+def test_micro_batcher_coalesces_concurrent_items():
+    """Test that items submitted together are processed in batches"""
+    batch_sizes = []
+
+    def process(items):
+        batch_sizes.append(len(items))
+        return items
+
+    batcher = MicroBatcher(process, max_batch_size=8, max_wait=0.2)
+    barrier = threading.Barrier(8)
+    results = []
+
+    def submit(i):
+        barrier.wait()
+        results.append(batcher.submit(i).result(timeout=5))
+
+    threads = [threading.Thread(target=submit, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert sorted(results) == list(range(8))
+    assert max(batch_sizes) > 1
+    assert all(size <= 8 for size in batch_sizes)
+
+
+def test_micro_batcher_propagates_errors():
+    """Test that a failing batch fails every future in it"""
+    def process(items):
+        raise RuntimeError("model crashed")
+
+    batcher = MicroBatcher(process)
+
+    with pytest.raises(RuntimeError, match="model crashed"):
+        batcher.submit("text").result(timeout=5)
+
+
+def test_micro_batcher_skips_cancelled_futures():
+    """Test that a future cancelled while queued is dropped and the worker keeps running"""
+    started = threading.Event()
+    release = threading.Event()
+    processed = []
+
+    def process(items):
+        started.set()
+        release.wait(timeout=5)
+        processed.extend(items)
+        return items
+
+    batcher = MicroBatcher(process, max_batch_size=1)
+    blocker = batcher.submit("first")
+    assert started.wait(timeout=5)
+
+    cancelled = batcher.submit("cancelled")  # still queued behind "first"
+    assert cancelled.cancel()
+    release.set()
+
+    assert blocker.result(timeout=5) == "first"
+    assert batcher.submit("after").result(timeout=5) == "after"
+    assert "cancelled" not in processed
+    assert batcher._worker.is_alive()
+
+
+def test_micro_batcher_fails_items_without_results():
+    """Test that futures left over by a short result list fail instead of hanging"""
+    def process(items):
+        return items[:1]
+
+    batcher = MicroBatcher(process, max_batch_size=4, max_wait=0.2)
+    futures = [batcher.submit(i) for i in range(3)]
+
+    assert futures[0].result(timeout=5) == 0
+    for future in futures[1:]:
+        with pytest.raises(RuntimeError, match="1 results for 3 items"):
+            future.result(timeout=5)
+
+
+def test_micro_batcher_survives_unexpected_errors():
+    """Test that an error while resolving a batch does not kill the worker"""
+    results = iter([None, ["ok"]])  # the first batch gets a non-sequence
+    batcher = MicroBatcher(lambda items: next(results))
+
+    with pytest.raises(TypeError):
+        batcher.submit("broken").result(timeout=5)
+    assert batcher.submit("next").result(timeout=5) == "ok"
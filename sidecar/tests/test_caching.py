@@ -0,0 +1,49 @@
+"""
+Unit tests for LRUCache
+Tests eviction order, hit/miss accounting and the disabled (maxsize=0) mode.
+"""
+import sys
+import os
+
+# Add parent directory to path so we can import sidecar modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np  # noqa: E402
+from caching import LRUCache  # noqa: E402
+
+
+def test_lru_cache_evicts_least_recently_used():
+    """Test that the cache keeps the most recently used entries"""
+    cache = LRUCache(maxsize=2)
+    cache.put("a", np.zeros(3, dtype=np.float32))
+    cache.put("b", np.ones(3, dtype=np.float32))
+
+    assert cache.get("a") is not None  # "a" is now most recently used
+    cache.put("c", np.ones(3, dtype=np.float32))
+
+    assert len(cache) == 2
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.hits == 2
+    assert cache.misses == 1
+
+
+def test_lru_cache_tuple_keys():
+    """Test search-style tuple keys, with a re-put value replacing the old one"""
+    cache = LRUCache(maxsize=10, name="Search")
+    key = ("shard", 0, b"\x00\x01", 10, 5)
+    cache.put(key, ([1, 2], [0.1, 0.2]))
+    cache.put(key, ([3], [0.3]))
+
+    assert cache.get(("shard", 0, b"\x00\x01", 10, 5)) == ([3], [0.3])
+    assert cache.get(("shard", 1, b"\x00\x01", 10, 5)) is None
+    assert len(cache) == 1
+
+
+def test_lru_cache_disabled():
+    """Test that maxsize=0 stores nothing"""
+    cache = LRUCache(maxsize=0)
+    cache.put("a", 1)
+
+    assert cache.get("a") is None
+    assert len(cache) == 0
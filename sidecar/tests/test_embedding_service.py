@@ -8,9 +8,11 @@ import os
 # Add parent directory to path so we can import sidecar modules
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+import asyncio  # noqa: E402
 import pytest  # noqa: E402
+import grpc  # noqa: E402
 import numpy as np  # noqa: E402
-from embedding_service import EmbeddingServiceImpl  # noqa: E402
+from embedding_service import EmbeddingServiceImpl, OnnxEmbeddingModel  # noqa: E402
 import vector_service_pb2  # noqa: E402
 
 
@@ -37,7 +39,8 @@ def embedding_service():
     return EmbeddingServiceImpl(model_name="all-MiniLM-L6-v2")
 
 
-def test_generate_embedding_single(embedding_service):
+@pytest.mark.asyncio
+async def test_generate_embedding_single(embedding_service):
     """Test single embedding generation"""
     request = vector_service_pb2.EmbeddingRequest(
         text="Hello world",
@@ -45,7 +48,7 @@ def test_generate_embedding_single(embedding_service):
     )
     context = MockContext()
 
-    response = embedding_service.GenerateEmbedding(request, context)
+    response = await embedding_service.GenerateEmbedding(request, context)
 
     assert response.dimension == 384  # all-MiniLM-L6-v2 has 384 dimensions
     assert len(response.vector) == 384
@@ -53,25 +56,27 @@ def test_generate_embedding_single(embedding_service):
     assert response.model_name == "all-MiniLM-L6-v2"
 
 
-def test_generate_embedding_empty_text(embedding_service):
+@pytest.mark.asyncio
+async def test_generate_embedding_empty_text(embedding_service):
     """Test that empty text is rejected"""
     request = vector_service_pb2.EmbeddingRequest(text="", model_name="all-MiniLM-L6-v2")
     context = MockContext()
 
-    embedding_service.GenerateEmbedding(request, context)
+    await embedding_service.GenerateEmbedding(request, context)
 
     assert context.code is not None  # Should set error code
     assert "empty" in context.details.lower()
 
 
-def test_generate_embedding_consistency(embedding_service):
+@pytest.mark.asyncio
+async def test_generate_embedding_consistency(embedding_service):
     """Test that same input produces same embedding"""
     text = "The quick brown fox jumps over the lazy dog"
     request = vector_service_pb2.EmbeddingRequest(text=text, model_name="all-MiniLM-L6-v2")
     context = MockContext()
 
-    response1 = embedding_service.GenerateEmbedding(request, context)
-    response2 = embedding_service.GenerateEmbedding(request, context)
+    response1 = await embedding_service.GenerateEmbedding(request, context)
+    response2 = await embedding_service.GenerateEmbedding(request, context)
 
     # Convert to numpy for easy comparison
     vec1 = np.array(response1.vector)
@@ -81,6 +86,29 @@ def test_generate_embedding_consistency(embedding_service):
     np.testing.assert_array_almost_equal(vec1, vec2, decimal=6)
 
 
+@pytest.mark.asyncio
+async def test_generate_embedding_after_cancelled_calls(embedding_service):
+    """Test single-text calls cancelled mid-flight do not stall the micro-batcher"""
+    tasks = [
+        asyncio.ensure_future(embedding_service.GenerateEmbedding(
+            vector_service_pb2.EmbeddingRequest(text=f"cancelled request {i}"), MockContext()
+        ))
+        for i in range(100)
+    ]
+    await asyncio.sleep(0)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    context = MockContext()
+    response = await asyncio.wait_for(
+        embedding_service.GenerateEmbedding(vector_service_pb2.EmbeddingRequest(text="still served"), context),
+        timeout=30
+    )
+    assert context.code is None
+    assert response.dimension == 384
+
+
 def test_generate_embedding_batch(embedding_service):
     """Test batch embedding generation"""
     texts = [
@@ -100,6 +128,37 @@ def test_generate_embedding_batch(embedding_service):
         assert emb.model_name == "all-MiniLM-L6-v2"
 
 
+def test_generate_embedding_batch_packed(embedding_service):
+    """Test packed batch embeddings match the per-text vectors"""
+    texts = ["First document", "Second document"]
+    context = MockContext()
+
+    packed = embedding_service.GenerateEmbeddingBatch(
+        vector_service_pb2.EmbeddingBatchRequest(texts=texts, packed=True), context
+    )
+    unpacked = embedding_service.GenerateEmbeddingBatch(
+        vector_service_pb2.EmbeddingBatchRequest(texts=texts), context
+    )
+
+    assert packed.dimension == 384
+    assert len(packed.embeddings) == 0
+    matrix = np.frombuffer(packed.packed_matrix, dtype=np.float32).reshape(-1, packed.dimension)
+    assert matrix.shape == (2, 384)
+    expected = np.array([emb.vector for emb in unpacked.embeddings], dtype=np.float32)
+    np.testing.assert_array_almost_equal(matrix, expected, decimal=6)
+
+
+def test_generate_embedding_batch_packed_rejects_blank_texts(embedding_service):
+    """Test that a packed request with blank texts is rejected instead of misaligning rows"""
+    request = vector_service_pb2.EmbeddingBatchRequest(texts=["First", "  ", "Third"], packed=True)
+    context = MockContext()
+
+    response = embedding_service.GenerateEmbeddingBatch(request, context)
+
+    assert context.code == grpc.StatusCode.INVALID_ARGUMENT
+    assert len(response.packed_matrix) == 0
+
+
 def test_generate_embedding_batch_empty(embedding_service):
     """Test that empty batch is rejected"""
     request = vector_service_pb2.EmbeddingBatchRequest(texts=[])
@@ -111,16 +170,17 @@ def test_generate_embedding_batch_empty(embedding_service):
     assert "required" in context.details.lower() or "empty" in context.details.lower()
 
 
-def test_embedding_similarity(embedding_service):
+@pytest.mark.asyncio
+async def test_embedding_similarity(embedding_service):
     """Test that similar texts have similar embeddings"""
     request1 = vector_service_pb2.EmbeddingRequest(text="I love cats", model_name="all-MiniLM-L6-v2")
     request2 = vector_service_pb2.EmbeddingRequest(text="I adore felines", model_name="all-MiniLM-L6-v2")
     request3 = vector_service_pb2.EmbeddingRequest(text="Quantum physics is complex", model_name="all-MiniLM-L6-v2")
     context = MockContext()
 
-    resp1 = embedding_service.GenerateEmbedding(request1, context)
-    resp2 = embedding_service.GenerateEmbedding(request2, context)
-    resp3 = embedding_service.GenerateEmbedding(request3, context)
+    resp1 = await embedding_service.GenerateEmbedding(request1, context)
+    resp2 = await embedding_service.GenerateEmbedding(request2, context)
+    resp3 = await embedding_service.GenerateEmbedding(request3, context)
 
     vec1 = np.array(resp1.vector)
     vec2 = np.array(resp2.vector)
@@ -135,3 +195,9 @@ def test_embedding_similarity(embedding_service):
 
     # "cats" and "felines" should be more similar than "cats" and "quantum physics"
     assert sim_12 > sim_13
+
+
+def test_onnx_model_missing_file():
+    """Test that the ONNX backend fails fast when the export is missing"""
+    with pytest.raises(FileNotFoundError):
+        OnnxEmbeddingModel(model_dir="/nonexistent/onnx-model")
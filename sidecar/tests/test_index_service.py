@@ -8,9 +8,11 @@ import os
 # Add parent directory to path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+import asyncio  # noqa: E402
 import pytest  # noqa: E402
 import tempfile  # noqa: E402
 import shutil  # noqa: E402
+import time  # noqa: E402
 import numpy as np  # noqa: E402
 import faiss  # noqa: E402
 from index_service import IndexServiceImpl, ShardIndex  # noqa: E402
@@ -23,6 +25,7 @@ class MockContext:
     def __init__(self):
         self.code = None
         self.details = None
+        self.compression_disabled = False
 
     def set_code(self, code):
         self.code = code
@@ -30,13 +33,16 @@ class MockContext:
     def set_details(self, details):
         self.details = details
 
+    def disable_next_message_compression(self):
+        self.compression_disabled = True
+
 
 @pytest.fixture
 def temp_index_dir():
     """Create a temporary directory with a test FAISS index"""
     temp_dir = tempfile.mkdtemp()
 
-    # Create a simple flat L2 index for testing
+    # Create an IVF-PQ index (the production index type) for testing
     dimension = 384
     n_vectors = 1000
 
@@ -44,8 +50,10 @@ def temp_index_dir():
     np.random.seed(42)
     vectors = np.random.random((n_vectors, dimension)).astype('float32')
 
-    # Create and train index
-    index = faiss.IndexFlatL2(dimension)
+    # Create and train index: 64 IVF lists, 48 PQ sub-quantizers (48-byte codes)
+    index = faiss.index_factory(dimension, "IVF64,PQ48")
+    index.do_polysemous_training = False  # factory default; slow and unused at search time
+    index.train(vectors)
     index.add(vectors)
 
     # Save to temp directory
@@ -100,7 +108,117 @@ def test_shard_search(temp_index_dir):
     assert all(0 <= i < 1000 for i in indices)
 
 
-def test_index_service_search(temp_index_dir):
+def test_shard_search_sets_nprobe_on_wrapped_ivf():
+    """Test nprobe reaches an IVF index wrapped in IndexPreTransform"""
+    dimension = 384
+    np.random.seed(42)
+    vectors = np.random.random((2000, dimension)).astype('float32')
+
+    ivf = faiss.IndexIVFFlat(faiss.IndexFlatL2(dimension), dimension, 16)
+    index = faiss.IndexPreTransform(faiss.NormalizationTransform(dimension, 2.0), ivf)
+    index.train(vectors)
+    index.add(vectors)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        index_path = os.path.join(temp_dir, "wrapped.index")
+        faiss.write_index(index, index_path)
+        shard = ShardIndex(shard_key="wrapped", index_path=index_path)
+
+        distances, indices = shard.search(vectors[0], top_k=5, nprobe=7)
+
+        assert faiss.extract_index_ivf(shard.index).nprobe == 7
+        assert indices[0] == 0  # the vector itself is its own nearest neighbour
+
+
+def test_shard_index_memory_maps_ivf_lists():
+    """Test IVF-PQ inverted lists are mapped from the file, and reload picks up a replaced file"""
+    dimension = 64
+    np.random.seed(42)
+    vectors = np.random.random((2000, dimension)).astype('float32')
+
+    index = faiss.IndexIVFPQ(faiss.IndexFlatL2(dimension), dimension, 16, 8, 8)
+    index.train(vectors)
+    index.add(vectors[:1000])
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        index_path = os.path.join(temp_dir, "mapped.index")
+        faiss.write_index(index, index_path)
+        shard = ShardIndex(shard_key="mapped", index_path=index_path)
+
+        invlists = faiss.downcast_InvertedLists(shard.ivf.invlists)
+        assert isinstance(invlists, faiss.OnDiskInvertedLists)
+        assert shard.search(vectors[0], top_k=1, nprobe=16)[1][0] == 0
+
+        # Builders replace the file atomically; the old mapping stays valid until the swap
+        index.add(vectors[1000:])
+        faiss.write_index(index, index_path + ".tmp")
+        os.replace(index_path + ".tmp", index_path)
+
+        assert shard.reload()
+        assert shard.total_vectors == 2000
+
+
+def test_nprobe_affects_recall(temp_index_dir):
+    """Test nprobe changes which IVF lists are scanned (and therefore the results)"""
+    index_path = os.path.join(temp_index_dir, "test_shard.index")
+    shard = ShardIndex(shard_key="test_shard", index_path=index_path)
+
+    np.random.seed(0)
+    queries = np.random.random((20, 384)).astype('float32')
+
+    narrow = [shard.search(q, top_k=10, nprobe=1)[1] for q in queries]
+    exhaustive = [shard.search(q, top_k=10, nprobe=64)[1] for q in queries]
+
+    assert any(not np.array_equal(a, b) for a, b in zip(narrow, exhaustive))
+    # Probing every list can only find closer (or the same) neighbours
+    for q in queries:
+        d_narrow = shard.search(q, top_k=10, nprobe=1)[0]
+        d_exhaustive = shard.search(q, top_k=10, nprobe=64)[0]
+        assert d_exhaustive[0] <= d_narrow[0] + 1e-5
+
+
+def test_shard_submit_search_batches_mixed_requests(temp_index_dir):
+    """Test batched searches with different top_k/nprobe match individual searches"""
+    index_path = os.path.join(temp_index_dir, "test_shard.index")
+    shard = ShardIndex(shard_key="test_shard", index_path=index_path)
+
+    np.random.seed(7)
+    queries = np.random.random((6, 384)).astype('float32')
+    params = [(3, 5), (10, 5), (5, 10), (1, 10), (7, 5), (10, 1)]
+
+    futures = [shard.submit_search(q, top_k, nprobe) for q, (top_k, nprobe) in zip(queries, params)]
+
+    for q, (top_k, nprobe), future in zip(queries, params, futures):
+        distances, indices = future.result(timeout=5)
+        expected_distances, expected_indices = shard.search(q, top_k, nprobe)
+        # Lists, not views of the shard's reused output buffers
+        assert isinstance(indices, list) and isinstance(distances, list)
+        assert len(indices) == top_k
+        np.testing.assert_array_equal(indices, expected_indices)
+        np.testing.assert_allclose(distances, expected_distances, rtol=1e-5)
+
+
+def test_shard_keeps_answering_after_failed_and_cancelled_searches(temp_index_dir):
+    """Test a failed batch or cancelled searches do not wedge the shard's batcher"""
+    index_path = os.path.join(temp_index_dir, "test_shard.index")
+    shard = ShardIndex(shard_key="test_shard", index_path=index_path)
+    query = np.random.random(384).astype('float32')
+
+    # Wrong dimension: the whole batch fails
+    with pytest.raises(ValueError):
+        shard.submit_search(np.zeros(3, dtype=np.float32), 5, 1).result(timeout=5)
+
+    # Callers giving up (e.g. client deadlines) while their searches are queued
+    for future in [shard.submit_search(query, 5, 1) for _ in range(20)]:
+        future.cancel()
+
+    distances, indices = shard.submit_search(query, 5, 1).result(timeout=5)
+    assert len(indices) == 5
+    assert len(distances) == 5
+
+
+@pytest.mark.asyncio
+async def test_index_service_search(temp_index_dir):
     """Test IndexService SearchIndex RPC"""
     service = IndexServiceImpl(index_dir=temp_index_dir)
 
@@ -113,20 +231,132 @@ def test_index_service_search(temp_index_dir):
     )
     context = MockContext()
 
-    response = service.SearchIndex(request, context)
+    response = await service.SearchIndex(request, context)
 
-    assert len(response.results) == 10
+    assert len(response.ids) == 10
+    assert len(response.scores) == 10
     assert response.shard_key == "test_shard"
     assert context.code is None  # No error
+    assert context.compression_disabled  # small response goes out uncompressed
 
     # Check that results have proper structure
-    for result in response.results:
-        assert hasattr(result, 'id')
-        assert hasattr(result, 'score')
-        assert 0 <= result.id < 1000  # Within our test data range
+    assert all(0 <= doc_id < 1000 for doc_id in response.ids)  # Within our test data range
+    assert list(response.scores) == sorted(response.scores)  # Nearest first
+
+
+@pytest.mark.asyncio
+async def test_index_service_search_cache(temp_index_dir):
+    """Test repeated searches are served from the result cache until the shard is reloaded"""
+    service = IndexServiceImpl(index_dir=temp_index_dir)
+
+    query_vector = np.random.random(384).astype('float32')
+    request = vector_service_pb2.SearchRequest(
+        shard_key="test_shard",
+        query_vector=query_vector.tolist(),
+        top_k=10,
+        nprobe=5
+    )
+
+    first = await service.SearchIndex(request, MockContext())
+    assert first.cache_hit is False
+
+    # Same query sent packed hits the same entry
+    packed = vector_service_pb2.SearchRequest(
+        shard_key="test_shard",
+        query_vector_packed=query_vector.tobytes(),
+        top_k=10,
+        nprobe=5
+    )
+    second = await service.SearchIndex(packed, MockContext())
+    assert second.cache_hit is True
+    assert list(second.ids) == list(first.ids)
+    assert list(second.scores) == list(first.scores)
+
+    # Different parameters are a different entry
+    request.top_k = 5
+    assert (await service.SearchIndex(request, MockContext())).cache_hit is False
+    request.top_k = 10
+
+    # A reload invalidates the shard's cached results
+    service.ReloadIndex(vector_service_pb2.ReloadIndexRequest(shard_key="test_shard"), MockContext())
+    assert (await service.SearchIndex(request, MockContext())).cache_hit is False
+
+
+@pytest.mark.asyncio
+async def test_index_service_search_after_cancelled_calls(temp_index_dir):
+    """Test searches cancelled mid-flight (client deadline/disconnect) do not stall the shard"""
+    service = IndexServiceImpl(index_dir=temp_index_dir)
+    np.random.seed(3)
+
+    def request():
+        return vector_service_pb2.SearchRequest(
+            shard_key="test_shard",
+            query_vector=np.random.random(384).astype('float32').tolist(),
+            top_k=10,
+            nprobe=5
+        )
+
+    # More than one batch, so some searches are still queued when cancelled
+    tasks = [asyncio.ensure_future(service.SearchIndex(request(), MockContext())) for _ in range(200)]
+    await asyncio.sleep(0)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    context = MockContext()
+    response = await asyncio.wait_for(service.SearchIndex(request(), context), timeout=5)
+    assert context.code is None
+    assert len(response.ids) == 10
+
+
+@pytest.mark.asyncio
+async def test_index_service_search_packed(temp_index_dir):
+    """Test SearchIndex accepts the query as packed float32 bytes"""
+    service = IndexServiceImpl(index_dir=temp_index_dir)
+
+    query_vector = np.random.random(384).astype('float32')
+    packed_request = vector_service_pb2.SearchRequest(
+        shard_key="test_shard",
+        query_vector_packed=query_vector.tobytes(),
+        top_k=10,
+        nprobe=5
+    )
+    repeated_request = vector_service_pb2.SearchRequest(
+        shard_key="test_shard",
+        query_vector=query_vector.tolist(),
+        top_k=10,
+        nprobe=5
+    )
+    context = MockContext()
+
+    packed_response = await service.SearchIndex(packed_request, context)
+    repeated_response = await service.SearchIndex(repeated_request, context)
+
+    assert context.code is None
+    assert list(packed_response.ids) == list(repeated_response.ids)
 
 
-def test_index_service_search_wrong_shard(temp_index_dir):
+@pytest.mark.asyncio
+async def test_index_service_search_packed_bad_length(temp_index_dir):
+    """Test SearchIndex rejects packed bytes that are not whole float32 values"""
+    service = IndexServiceImpl(index_dir=temp_index_dir)
+
+    request = vector_service_pb2.SearchRequest(
+        shard_key="test_shard",
+        query_vector_packed=b"\x00" * 1535,
+        top_k=10,
+        nprobe=5
+    )
+    context = MockContext()
+
+    await service.SearchIndex(request, context)
+
+    assert context.code is not None
+    assert "multiple of 4" in context.details
+
+
+@pytest.mark.asyncio
+async def test_index_service_search_wrong_shard(temp_index_dir):
     """Test IndexService returns error for non-existent shard"""
     service = IndexServiceImpl(index_dir=temp_index_dir)
 
@@ -139,13 +369,14 @@ def test_index_service_search_wrong_shard(temp_index_dir):
     )
     context = MockContext()
 
-    service.SearchIndex(request, context)
+    await service.SearchIndex(request, context)
 
     assert context.code is not None  # Should set error code
     assert "not found" in context.details.lower()
 
 
-def test_index_service_search_wrong_dimension(temp_index_dir):
+@pytest.mark.asyncio
+async def test_index_service_search_wrong_dimension(temp_index_dir):
     """Test IndexService rejects query with wrong dimension"""
     service = IndexServiceImpl(index_dir=temp_index_dir)
 
@@ -159,7 +390,7 @@ def test_index_service_search_wrong_dimension(temp_index_dir):
     )
     context = MockContext()
 
-    service.SearchIndex(request, context)
+    await service.SearchIndex(request, context)
 
     assert context.code is not None
     assert "dimension" in context.details.lower()
@@ -196,6 +427,45 @@ def test_index_service_reload(temp_index_dir):
     assert "test_shard" in response.reloaded_shards
 
 
+def test_index_service_get_info_after_reload(temp_index_dir):
+    """Test GetIndexInfo reflects a shard replaced on disk once it is reloaded"""
+    service = IndexServiceImpl(index_dir=temp_index_dir)
+
+    index = faiss.IndexFlatL2(384)
+    index.add(np.random.random((1500, 384)).astype('float32'))
+    index_path = os.path.join(temp_index_dir, "test_shard.index")
+    faiss.write_index(index, index_path + ".tmp")
+    os.replace(index_path + ".tmp", index_path)
+
+    response = service.GetIndexInfo(vector_service_pb2.IndexInfoRequest(), MockContext())
+    assert response.shards[0].total_vectors == 1000
+
+    service.ReloadIndex(vector_service_pb2.ReloadIndexRequest(shard_key="test_shard"), MockContext())
+
+    response = service.GetIndexInfo(vector_service_pb2.IndexInfoRequest(), MockContext())
+    assert response.shards[0].total_vectors == 1500
+
+
+def test_index_service_watch_reloads_replaced_index(temp_index_dir):
+    """Test the directory watcher reloads a shard when its file is atomically replaced"""
+    pytest.importorskip("watchdog")
+    service = IndexServiceImpl(index_dir=temp_index_dir, watch=True)
+    assert service.shards["test_shard"].total_vectors == 1000
+
+    index = faiss.IndexFlatL2(384)
+    index.add(np.random.random((1500, 384)).astype('float32'))
+    index_path = os.path.join(temp_index_dir, "test_shard.index")
+    faiss.write_index(index, index_path + ".tmp")
+    os.replace(index_path + ".tmp", index_path)
+
+    deadline = time.time() + 5
+    while service.shards["test_shard"].total_vectors != 1500 and time.time() < deadline:
+        time.sleep(0.05)
+
+    service._observer.stop()
+    assert service.shards["test_shard"].total_vectors == 1500
+
+
 def test_index_service_reload_nonexistent(temp_index_dir):
     """Test IndexService reload fails for non-existent shard"""
     service = IndexServiceImpl(index_dir=temp_index_dir)
@@ -14,7 +14,7 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x14vector_service.proto\x12\rvectorservice\"4\n\x10\x45mbeddingRequest\x12\x0c\n\x04text\x18\x01 \x01(\t\x12\x12\n\nmodel_name\x18\x02 \x01(\t\"^\n\x11\x45mbeddingResponse\x12\x0e\n\x06vector\x18\x01 \x03(\x02\x12\x11\n\tdimension\x18\x02 \x01(\x05\x12\x12\n\nmodel_name\x18\x03 \x01(\t\x12\x12\n\nlatency_ms\x18\x04 \x01(\x01\":\n\x15\x45mbeddingBatchRequest\x12\r\n\x05texts\x18\x01 \x03(\t\x12\x12\n\nmodel_name\x18\x02 \x01(\t\"h\n\x16\x45mbeddingBatchResponse\x12\x34\n\nembeddings\x18\x01 \x03(\x0b\x32 .vectorservice.EmbeddingResponse\x12\x18\n\x10total_latency_ms\x18\x02 \x01(\x01\"W\n\rSearchRequest\x12\x14\n\x0cquery_vector\x18\x01 \x03(\x02\x12\r\n\x05top_k\x18\x02 \x01(\x05\x12\x11\n\tshard_key\x18\x03 \x01(\t\x12\x0e\n\x06nprobe\x18\x04 \x01(\x05\"@\n\x0cSearchResult\x12\n\n\x02id\x18\x01 \x01(\x03\x12\r\n\x05score\x18\x02 \x01(\x02\x12\x15\n\rmetadata_json\x18\x03 \x01(\t\"\x7f\n\x0eSearchResponse\x12,\n\x07results\x18\x01 \x03(\x0b\x32\x1b.vectorservice.SearchResult\x12\x11\n\tshard_key\x18\x02 \x01(\t\x12\x19\n\x11search_latency_ms\x18\x03 \x01(\x01\x12\x11\n\tcache_hit\x18\x04 \x01(\x08\"%\n\x10IndexInfoRequest\x12\x11\n\tshard_key\x18\x01 \x01(\t\"=\n\x11IndexInfoResponse\x12(\n\x06shards\x18\x01 \x03(\x0b\x32\x18.vectorservice.ShardInfo\"\x9e\x01\n\tShardInfo\x12\x11\n\tshard_key\x18\x01 \x01(\t\x12\x15\n\rtotal_vectors\x18\x02 \x01(\x03\x12\x11\n\tdimension\x18\x03 \x01(\x05\x12\x12\n\nindex_type\x18\x04 \x01(\t\x12\x12\n\nis_trained\x18\x05 \x01(\x08\x12\x12\n\nindex_path\x18\x06 \x01(\t\x12\x18\n\x10index_size_bytes\x18\x07 \x01(\x03\";\n\x12ReloadIndexRequest\x12\x11\n\tshard_key\x18\x01 \x01(\t\x12\x12\n\nindex_path\x18\x02 \x01(\t\"P\n\x13ReloadIndexResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x0f\n\x07message\x18\x02 \x01(\t\x12\x17\n\x0freloaded_shards\x18\x03 \x03(\t2\xd1\x01\n\x10\x45mbeddingService\x12V\n\x11GenerateEmbedding\x12\x1f.vectorservice.EmbeddingRequest\x1a .vectorservice.EmbeddingResponse\x12\x65\n\x16GenerateEmbeddingBatch\x12$.vectorservice.EmbeddingBatchRequest\x1a%.vectorservice.EmbeddingBatchResponse2\x83\x02\n\x0cIndexService\x12J\n\x0bSearchIndex\x12\x1c.vectorservice.SearchRequest\x1a\x1d.vectorservice.SearchResponse\x12Q\n\x0cGetIndexInfo\x12\x1f.vectorservice.IndexInfoRequest\x1a .vectorservice.IndexInfoResponse\x12T\n\x0bReloadIndex\x12!.vectorservice.ReloadIndexRequest\x1a\".vectorservice.ReloadIndexResponseB\x1b\xaa\x02\x18VectorCatalog.Api.Protosb\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x14vector_service.proto\x12\rvectorservice\"4\n\x10\x45mbeddingRequest\x12\x0c\n\x04text\x18\x01 \x01(\t\x12\x12\n\nmodel_name\x18\x02 \x01(\t\"^\n\x11\x45mbeddingResponse\x12\x0e\n\x06vector\x18\x01 \x03(\x02\x12\x11\n\tdimension\x18\x02 \x01(\x05\x12\x12\n\nmodel_name\x18\x03 \x01(\t\x12\x12\n\nlatency_ms\x18\x04 \x01(\x01\"J\n\x15\x45mbeddingBatchRequest\x12\r\n\x05texts\x18\x01 \x03(\t\x12\x12\n\nmodel_name\x18\x02 \x01(\t\x12\x0e\n\x06packed\x18\x03 \x01(\x08\"\x92\x01\n\x16\x45mbeddingBatchResponse\x12\x34\n\nembeddings\x18\x01 \x03(\x0b\x32 .vectorservice.EmbeddingResponse\x12\x18\n\x10total_latency_ms\x18\x02 \x01(\x01\x12\x15\n\rpacked_matrix\x18\x03 \x01(\x0c\x12\x11\n\tdimension\x18\x04 \x01(\x05\"t\n\rSearchRequest\x12\x14\n\x0cquery_vector\x18\x01 \x03(\x02\x12\r\n\x05top_k\x18\x02 \x01(\x05\x12\x11\n\tshard_key\x18\x03 \x01(\t\x12\x0e\n\x06nprobe\x18\x04 \x01(\x05\x12\x1b\n\x13query_vector_packed\x18\x05 \x01(\x0c\"@\n\x0cSearchResult\x12\n\n\x02id\x18\x01 \x01(\x03\x12\r\n\x05score\x18\x02 \x01(\x02\x12\x15\n\rmetadata_json\x18\x03 \x01(\t\"\x9c\x01\n\x0eSearchResponse\x12,\n\x07results\x18\x01 \x03(\x0b\x32\x1b.vectorservice.SearchResult\x12\x11\n\tshard_key\x18\x02 \x01(\t\x12\x19\n\x11search_latency_ms\x18\x03 \x01(\x01\x12\x11\n\tcache_hit\x18\x04 \x01(\x08\x12\x0b\n\x03ids\x18\x05 \x03(\x03\x12\x0e\n\x06scores\x18\x06 \x03(\x02\"%\n\x10IndexInfoRequest\x12\x11\n\tshard_key\x18\x01 \x01(\t\"=\n\x11IndexInfoResponse\x12(\n\x06shards\x18\x01 \x03(\x0b\x32\x18.vectorservice.ShardInfo\"\x9e\x01\n\tShardInfo\x12\x11\n\tshard_key\x18\x01 \x01(\t\x12\x15\n\rtotal_vectors\x18\x02 \x01(\x03\x12\x11\n\tdimension\x18\x03 \x01(\x05\x12\x12\n\nindex_type\x18\x04 \x01(\t\x12\x12\n\nis_trained\x18\x05 \x01(\x08\x12\x12\n\nindex_path\x18\x06 \x01(\t\x12\x18\n\x10index_size_bytes\x18\x07 \x01(\x03\";\n\x12ReloadIndexRequest\x12\x11\n\tshard_key\x18\x01 \x01(\t\x12\x12\n\nindex_path\x18\x02 \x01(\t\"P\n\x13ReloadIndexResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x0f\n\x07message\x18\x02 \x01(\t\x12\x17\n\x0freloaded_shards\x18\x03 \x03(\t2\xd1\x01\n\x10\x45mbeddingService\x12V\n\x11GenerateEmbedding\x12\x1f.vectorservice.EmbeddingRequest\x1a .vectorservice.EmbeddingResponse\x12\x65\n\x16GenerateEmbeddingBatch\x12$.vectorservice.EmbeddingBatchRequest\x1a%.vectorservice.EmbeddingBatchResponse2\x83\x02\n\x0cIndexService\x12J\n\x0bSearchIndex\x12\x1c.vectorservice.SearchRequest\x1a\x1d.vectorservice.SearchResponse\x12Q\n\x0cGetIndexInfo\x12\x1f.vectorservice.IndexInfoRequest\x1a .vectorservice.IndexInfoResponse\x12T\n\x0bReloadIndex\x12!.vectorservice.ReloadIndexRequest\x1a\".vectorservice.ReloadIndexResponseB\x1b\xaa\x02\x18VectorCatalog.Api.Protosb\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
@@ -27,27 +27,27 @@ if _descriptor._USE_C_DESCRIPTORS == False:
   _globals['_EMBEDDINGRESPONSE']._serialized_start=93
   _globals['_EMBEDDINGRESPONSE']._serialized_end=187
   _globals['_EMBEDDINGBATCHREQUEST']._serialized_start=189
-  _globals['_EMBEDDINGBATCHREQUEST']._serialized_end=247
-  _globals['_EMBEDDINGBATCHRESPONSE']._serialized_start=249
-  _globals['_EMBEDDINGBATCHRESPONSE']._serialized_end=353
-  _globals['_SEARCHREQUEST']._serialized_start=355
-  _globals['_SEARCHREQUEST']._serialized_end=442
-  _globals['_SEARCHRESULT']._serialized_start=444
-  _globals['_SEARCHRESULT']._serialized_end=508
-  _globals['_SEARCHRESPONSE']._serialized_start=510
-  _globals['_SEARCHRESPONSE']._serialized_end=637
-  _globals['_INDEXINFOREQUEST']._serialized_start=639
-  _globals['_INDEXINFOREQUEST']._serialized_end=676
-  _globals['_INDEXINFORESPONSE']._serialized_start=678
-  _globals['_INDEXINFORESPONSE']._serialized_end=739
-  _globals['_SHARDINFO']._serialized_start=742
-  _globals['_SHARDINFO']._serialized_end=900
-  _globals['_RELOADINDEXREQUEST']._serialized_start=902
-  _globals['_RELOADINDEXREQUEST']._serialized_end=961
-  _globals['_RELOADINDEXRESPONSE']._serialized_start=963
-  _globals['_RELOADINDEXRESPONSE']._serialized_end=1043
-  _globals['_EMBEDDINGSERVICE']._serialized_start=1046
-  _globals['_EMBEDDINGSERVICE']._serialized_end=1255
-  _globals['_INDEXSERVICE']._serialized_start=1258
-  _globals['_INDEXSERVICE']._serialized_end=1517
+  _globals['_EMBEDDINGBATCHREQUEST']._serialized_end=263
+  _globals['_EMBEDDINGBATCHRESPONSE']._serialized_start=266
+  _globals['_EMBEDDINGBATCHRESPONSE']._serialized_end=412
+  _globals['_SEARCHREQUEST']._serialized_start=414
+  _globals['_SEARCHREQUEST']._serialized_end=530
+  _globals['_SEARCHRESULT']._serialized_start=532
+  _globals['_SEARCHRESULT']._serialized_end=596
+  _globals['_SEARCHRESPONSE']._serialized_start=599
+  _globals['_SEARCHRESPONSE']._serialized_end=755
+  _globals['_INDEXINFOREQUEST']._serialized_start=757
+  _globals['_INDEXINFOREQUEST']._serialized_end=794
+  _globals['_INDEXINFORESPONSE']._serialized_start=796
+  _globals['_INDEXINFORESPONSE']._serialized_end=857
+  _globals['_SHARDINFO']._serialized_start=860
+  _globals['_SHARDINFO']._serialized_end=1018
+  _globals['_RELOADINDEXREQUEST']._serialized_start=1020
+  _globals['_RELOADINDEXREQUEST']._serialized_end=1079
+  _globals['_RELOADINDEXRESPONSE']._serialized_start=1081
+  _globals['_RELOADINDEXRESPONSE']._serialized_end=1161
+  _globals['_EMBEDDINGSERVICE']._serialized_start=1164
+  _globals['_EMBEDDINGSERVICE']._serialized_end=1373
+  _globals['_INDEXSERVICE']._serialized_start=1376
+  _globals['_INDEXSERVICE']._serialized_end=1635
 # @@protoc_insertion_point(module_scope)
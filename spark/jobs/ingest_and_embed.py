@@ -2,21 +2,47 @@
 PySpark Ingestion Job: NYC Taxi Data → Embeddings → Delta Lake
 Reads parquet files, generates embeddings via gRPC sidecar, writes to Delta.
 Supports incremental processing and partitioning by year/month.
+
+Embeddings come from mapInArrow: each Arrow record batch of texts is sent
+to the sidecar as up to MAX_INFLIGHT_RPCS concurrent GenerateEmbeddingBatch
+calls of BATCH_SIZE texts, and the vectors come back as one packed float32
+matrix per call.
+
+Embeddings are stored as INT8 with a per-vector scale — a struct
+<q: array<tinyint>, scale: float> where embedding ≈ q * scale — which is 4x
+smaller than FP32 (see quantization.py; scripts/build_faiss_index.py
+dequantizes on load).
+
+Reruns are incremental: when the Delta table already exists, trips whose key
+(MERGE_KEY_COLUMNS) is already stored are dropped before embedding, texts
+already in the table reuse their stored embeddings, and the remaining rows are
+MERGEd in (insert-only), leaving existing files untouched.
 """
 import sys
 import os
 import time
+import itertools
 import logging
-from datetime import datetime
+from collections import deque
+from typing import Iterator
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+from delta.tables import DeltaTable
+from pyspark import StorageLevel
 from pyspark.sql import SparkSession
-from pyspark.sql.functions import udf, col, concat_ws, lit, year, month
-from pyspark.sql.types import ArrayType, FloatType
+from pyspark.sql.functions import broadcast, col, current_timestamp, exists, format_string, lit, year, month
+from pyspark.sql.functions import round as spark_round
+from pyspark.sql.pandas.types import to_arrow_schema
+from pyspark.sql.types import ArrayType, ByteType, FloatType, StructField, StructType
 import grpc
+from quantization import embedding_table_mismatch, int8_struct_array, quantize_int8
 
 # Add sidecar protos to path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../sidecar')))
 import vector_service_pb2  # noqa: E402
 import vector_service_pb2_grpc  # noqa: E402
+from caching import LRUCache  # noqa: E402
 
 # Configure logging
 logging.basicConfig(
@@ -31,51 +57,187 @@ GRPC_PORT = os.getenv('GRPC_PORT', '50051')
 INPUT_PATH = os.getenv('INPUT_PATH', 'data/raw/yellow_tripdata_2023-01.parquet')
 DELTA_OUTPUT_PATH = os.getenv('DELTA_OUTPUT_PATH', 'data/delta/taxi_embeddings')
 BATCH_SIZE = int(os.getenv('BATCH_SIZE', '1000'))  # Embeddings per gRPC call
+GRPC_POOL_SIZE = int(os.getenv('GRPC_POOL_SIZE', '4'))  # Sidecar connections per Python worker
+MAX_INFLIGHT_RPCS = int(os.getenv('MAX_INFLIGHT_RPCS', str(GRPC_POOL_SIZE)))  # Concurrent batch calls per worker
+# Rows per Arrow record batch handed to the embedding stage
+ARROW_BATCH_RECORDS = BATCH_SIZE * MAX_INFLIGHT_RPCS
+# Texts whose embeddings each Python worker keeps (~1.5 KB each; 0 disables);
+# trip texts repeat heavily, so most rows never reach the sidecar
+EMBEDDING_CACHE_SIZE = int(os.getenv('EMBEDDING_CACHE_SIZE', '50000'))
+# Distinct texts embedded once and broadcast-joined back when at most this many
+# (~1.5 KB per embedded text); larger sets use a shuffle join instead
+DEDUP_BROADCAST_MAX_TEXTS = int(os.getenv('DEDUP_BROADCAST_MAX_TEXTS', '100000'))
+# Skip deduplication when distinct texts exceed this fraction of the rows
+DEDUP_MAX_DISTINCT_RATIO = 0.9
+# Columns identifying a trip; rows whose key is already in the table are skipped
+MERGE_KEY_COLUMNS = ["VendorID", "tpep_pickup_datetime", "PULocationID", "DOLocationID"]
+# Source columns the job uses (the taxi parquet files have ~19)
+INPUT_COLUMNS = [
+    "VendorID",
+    "tpep_pickup_datetime",
+    "tpep_dropoff_datetime",
+    "passenger_count",
+    "trip_distance",
+    "PULocationID",
+    "DOLocationID",
+    "fare_amount",
+    "tip_amount",
+    "total_amount",
+]
+# Initial shuffle partitions; AQE coalesces the small ones after the shuffle
+SHUFFLE_PARTITIONS = int(os.getenv('SHUFFLE_PARTITIONS', str(4 * (os.cpu_count() or 2))))
+# JVM heap per executor/driver; spark-submit --executor-memory/--driver-memory
+# or spark-defaults take precedence when the env vars are unset
+EXECUTOR_MEMORY = os.getenv('EXECUTOR_MEMORY', '4g')
+DRIVER_MEMORY = os.getenv('DRIVER_MEMORY', '2g')
+# Memory a Python worker uses before its aggregations spill to disk
+PYTHON_WORKER_MEMORY = os.getenv('PYTHON_WORKER_MEMORY', '2g')
+# Cores per task; the embedding stage waits on gRPC rather than computing
+TASK_CPUS = int(os.getenv('TASK_CPUS', '1'))
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+EMBEDDING_DIMENSION = 384
+EMBEDDING_QUANTIZATION = "int8"
 
+# Stored embedding: symmetric INT8 codes plus one FP32 scale per vector
+EMBEDDING_TYPE = StructType([
+    StructField("q", ArrayType(ByteType())),
+    StructField("scale", FloatType()),
+])
 
-def create_embedding_udf():
+
+class ChannelPool:
     """
-    Create a PySpark UDF that calls the gRPC embedding service.
-    Uses thread-local connection pooling for efficiency.
+    Round-robin pool of independent gRPC channels to the embedding sidecar.
+
+    Each channel gets its own TCP connection (a local subchannel pool — by
+    default gRPC shares one connection between channels with identical
+    arguments), so concurrent batches are not multiplexed over one HTTP/2
+    connection's flow-control window.
     """
-    import threading
-    thread_local = threading.local()
 
-    def get_grpc_stub():
-        """Get or create thread-local gRPC stub"""
-        if not hasattr(thread_local, 'stub'):
-            channel = grpc.insecure_channel(
+    def __init__(self, size: int):
+        self.channels = [
+            grpc.insecure_channel(
                 f'{GRPC_HOST}:{GRPC_PORT}',
                 options=[
                     ('grpc.max_send_message_length', 100 * 1024 * 1024),
                     ('grpc.max_receive_message_length', 100 * 1024 * 1024),
+                    ('grpc.use_local_subchannel_pool', 1),
                 ]
             )
-            thread_local.stub = vector_service_pb2_grpc.EmbeddingServiceStub(channel)
-            thread_local.channel = channel
-        return thread_local.stub
-
-    def generate_embedding(text):
-        """
-        Generate embedding for a single text via gRPC.
-        Returns list of floats (384 dimensions for all-MiniLM-L6-v2).
-        """
-        if not text or text.strip() == "":
-            return [0.0] * 384  # Return zero vector for empty text
+            for _ in range(size)
+        ]
+        self.stubs = [vector_service_pb2_grpc.EmbeddingServiceStub(channel) for channel in self.channels]
+        self._counter = itertools.count()
+
+    def next_stub(self):
+        """Stub on the next channel in round-robin order."""
+        return self.stubs[next(self._counter) % len(self.stubs)]
+
+
+# One pool and cache per Python worker process, created on first use. Spark
+# reuses Python workers across tasks, so both outlive a single partition; the
+# channels are never closed explicitly and go away with the worker process.
+_channel_pool = None
+_embedding_cache = None
+
+
+def get_channel_pool() -> ChannelPool:
+    """Get or create this worker's ChannelPool"""
+    global _channel_pool
+    if _channel_pool is None:
+        _channel_pool = ChannelPool(GRPC_POOL_SIZE)
+    return _channel_pool
+
 
+def get_embedding_cache() -> LRUCache:
+    """Get or create this worker's text → embedding LRU cache"""
+    global _embedding_cache
+    if _embedding_cache is None:
+        _embedding_cache = LRUCache(EMBEDDING_CACHE_SIZE, name="Embedding")
+    return _embedding_cache
+
+
+def embed_texts(pool: ChannelPool, cache: LRUCache, texts: pa.Array) -> pa.StructArray:
+    """
+    Generate embeddings for an Arrow batch of texts via batched gRPC calls.
+    Each distinct text is embedded once, and texts already in the worker's
+    cache are not sent at all.
+    Returns one INT8-quantized embedding per text: a struct array with fields
+    q (384 int8 codes for all-MiniLM-L6-v2) and scale.
+    """
+    texts = pc.utf8_slice_codeunits(pc.fill_null(texts, ""), 0, 512)  # Truncate to prevent token limit issues
+    encoded = texts.dictionary_encode()
+    text_ids = encoded.indices.to_numpy(zero_copy_only=False)
+    uniques = encoded.dictionary.to_pylist()
+
+    # Zero vector for empty texts and for texts of a failed call
+    unique_embeddings = np.zeros((len(uniques), EMBEDDING_DIMENSION), dtype=np.float32)
+    # Blank texts are masked out in one vectorized pass and keep their zero
+    # vector; the sidecar would drop them anyway
+    non_blank = np.flatnonzero(
+        pc.not_equal(pc.utf8_trim_whitespace(encoded.dictionary), "").to_numpy(zero_copy_only=False)
+    )
+
+    misses = []
+    for i in non_blank:
+        embedding = cache.get(uniques[i])
+        if embedding is None:
+            misses.append(i)
+        else:
+            unique_embeddings[i] = embedding
+
+    def collect(chunk, future):
         try:
-            stub = get_grpc_stub()
-            request = vector_service_pb2.EmbeddingRequest(
-                text=text[:512],  # Truncate to prevent token limit issues
-                model_name="all-MiniLM-L6-v2"
+            response = future.result()
+            unique_embeddings[chunk] = np.frombuffer(response.packed_matrix, dtype=np.float32).reshape(
+                -1, response.dimension
             )
-            response = stub.GenerateEmbedding(request)
-            return list(response.vector)
+            for i in chunk:
+                cache.put(uniques[i], unique_embeddings[i].copy())
         except Exception as e:
-            logger.error(f"Error generating embedding: {e}")
-            return [0.0] * 384  # Fallback to zero vector on error
+            logger.error(f"Error generating embeddings for {len(chunk)} texts: {e}")
+
+    # Non-blocking calls: up to MAX_INFLIGHT_RPCS batches are in flight at once
+    # (spread over the pool's connections) instead of idling for each round trip
+    in_flight = deque()
+    for start in range(0, len(misses), BATCH_SIZE):
+        chunk = misses[start:start + BATCH_SIZE]
+        request = vector_service_pb2.EmbeddingBatchRequest(
+            texts=[uniques[i] for i in chunk],
+            model_name=EMBEDDING_MODEL,
+            packed=True  # one float32 matrix instead of a message per text
+        )
+        in_flight.append((chunk, pool.next_stub().GenerateEmbeddingBatch.future(request)))
+        if len(in_flight) >= MAX_INFLIGHT_RPCS:
+            collect(*in_flight.popleft())
+    while in_flight:
+        collect(*in_flight.popleft())
+
+    codes, scales = quantize_int8(unique_embeddings)
+    return int8_struct_array(codes[text_ids], scales[text_ids])
 
-    return udf(generate_embedding, ArrayType(FloatType()))
+
+def embed_dataframe(df, text_column: str = "text_repr"):
+    """
+    Append an "embedding" column to df via mapInArrow, calling the gRPC
+    embedding service once per BATCH_SIZE texts instead of once per row.
+    Record batches go to Python and back as Arrow with no pandas conversion;
+    the other columns pass through untouched.
+    Calls go round-robin over the worker's ChannelPool and skip texts already
+    in the worker's embedding cache; both are created once and reused for every
+    record batch and every task the worker runs.
+    """
+    schema = StructType(df.schema.fields + [StructField("embedding", EMBEDDING_TYPE)])
+
+    def generate_embeddings(batches: Iterator[pa.RecordBatch]) -> Iterator[pa.RecordBatch]:
+        pool = get_channel_pool()
+        cache = get_embedding_cache()
+        for batch in batches:
+            embeddings = embed_texts(pool, cache, batch.column(text_column))
+            yield pa.RecordBatch.from_arrays(batch.columns + [embeddings], names=batch.schema.names + ["embedding"])
+
+    return df.mapInArrow(generate_embeddings, schema)
 
 
 def create_spark_session():
@@ -85,9 +247,46 @@ def create_spark_session():
             .config("spark.jars.packages", "io.delta:delta-spark_2.12:3.1.0")
             .config("spark.sql.extensions", "io.delta.sql.DeltaSparkSessionExtension")
             .config("spark.sql.catalog.spark_catalog", "org.apache.spark.sql.delta.catalog.DeltaCatalog")
-            .config("spark.sql.shuffle.partitions", "8")
-            .config("spark.executor.memory", "4g")
-            .config("spark.driver.memory", "2g")
+            .config("spark.sql.shuffle.partitions", str(SHUFFLE_PARTITIONS))
+            # Cap output files at ~1M rows (~0.5 GB with INT8 embeddings)
+            .config("spark.sql.files.maxRecordsPerFile", "1000000")
+            # zstd (level 3) compresses the embedding columns better than the
+            # default snappy at similar CPU; set on the session so MERGE writes
+            # use it too, not just the initial save
+            .config("spark.sql.parquet.compression.codec", "zstd")
+            .config("spark.hadoop.parquet.compression.codec.zstd.level", "3")
+            # The per-vector scales are unique floats, so a dictionary only
+            # adds a page that is thrown away; the INT8 codes (at most 255
+            # values) keep it, as it packs them to 8-bit indices
+            .config("spark.hadoop.parquet.enable.dictionary#embedding.scale", "false")
+            # Vectorized parquet reads decode twice the default rows per batch
+            # (the reader itself, 128 MB splits and 8 MB buffers are defaults)
+            .config("spark.sql.parquet.columnarReaderBatchSize", "8192")
+            # Push the fare/distance filters into the reader so row groups whose
+            # min/max statistics cannot match are skipped undecoded (pinned so a
+            # cluster-level override cannot silently turn it off)
+            .config("spark.sql.parquet.filterPushdown", "true")
+            # Parquet on S3 is read by seeking to column chunks, not sequentially
+            .config("spark.hadoop.fs.s3a.experimental.input.fadvise", "random")
+            .config("spark.hadoop.fs.s3a.readahead.range", "1048576")
+            # Arrow record batches for the mapInArrow embedding stage (and
+            # toPandas). A batch carries enough texts for MAX_INFLIGHT_RPCS
+            # GenerateEmbeddingBatch calls of BATCH_SIZE, so embed_texts can
+            # keep that many in flight; a one-call batch would never pipeline
+            .config("spark.sql.execution.arrow.pyspark.enabled", "true")
+            .config("spark.sql.execution.arrow.maxRecordsPerBatch", str(ARROW_BATCH_RECORDS))
+            # Fall back to the non-Arrow path instead of failing when a
+            # conversion is unsupported (toPandas/createDataFrame)
+            .config("spark.sql.execution.arrow.pyspark.fallback.enabled", "true")
+            .config("spark.executor.memory", EXECUTOR_MEMORY)
+            # Only effective when the driver JVM is not running yet (local
+            # python runs); under spark-submit pass --driver-memory instead
+            .config("spark.driver.memory", DRIVER_MEMORY)
+            .config("spark.task.cpus", str(TASK_CPUS))
+            # Reused Python workers keep the gRPC channel pool and embedding
+            # cache across tasks; they are what the module globals rely on
+            .config("spark.python.worker.reuse", "true")
+            .config("spark.python.worker.memory", PYTHON_WORKER_MEMORY)
             # Adaptive Query Execution (AQE) — Spark 3.x:
             # Dynamically coalesces shuffle partitions to reduce small-file overhead
             # at 100M+ record scale where static partition counts cause imbalance.
@@ -106,25 +305,75 @@ def create_text_representation(df):
     Concatenate relevant taxi trip columns into a single text field.
     This text will be embedded by the sentence-transformer model.
 
-    Example text: "taxi ride manhattan pickup drop off midtown distance 2.5 miles fare 15 dollars"
+    Distance is rounded to 0.1 miles and fare to $0.50 first: finer digits do
+    not change the embedding meaningfully, but they make nearly every text
+    unique and defeat deduplication and the embedding cache.
+
+    Example text: "taxi ride manhattan 161 to 236 distance 2.5 miles fare 15.50 dollars"
     """
+    # One format_string expression instead of a nine-operand concat_ws with
+    # per-column casts; fixed decimals also keep the texts uniform
     return df.withColumn(
         "text_repr",
-        concat_ws(
-            " ",
-            lit("taxi ride manhattan"),
-            col("PULocationID").cast("string"),
-            lit("to"),
-            col("DOLocationID").cast("string"),
-            lit("distance"),
-            col("trip_distance").cast("string"),
-            lit("miles fare"),
-            col("fare_amount").cast("string"),
-            lit("dollars")
+        format_string(
+            "taxi ride manhattan %d to %d distance %.1f miles fare %.2f dollars",
+            col("PULocationID"),
+            col("DOLocationID"),
+            spark_round(col("trip_distance"), 1),
+            spark_round(col("fare_amount") * 2) / 2
         )
     )
 
 
+def reusable_embeddings(existing):
+    """
+    (text_repr, embedding) rows of the existing Delta table that can stand in
+    for new sidecar calls.
+    All-zero codes are left out: they are what a failed sidecar call writes,
+    and reusing them would keep those texts unembedded on every rerun.
+    """
+    return (existing.toDF()
+            .select("text_repr", "embedding")
+            .filter(exists(col("embedding.q"), lambda code: code != 0)))
+
+
+def add_embeddings(df_with_text, total_rows: int, known_embeddings=None):
+    """
+    Add the "embedding" column, calling the sidecar once per distinct text_repr
+    rather than once per row, and joining the vectors back onto the rows.
+    Texts found in known_embeddings (text_repr, embedding rows from the Delta
+    table) reuse the stored vectors instead of being embedded again.
+    Falls back to embedding every row when nearly all texts are distinct and
+    there are no stored embeddings to reuse.
+
+    Returns:
+        Tuple of (DataFrame with the embedding column, cached distinct-text
+        DataFrame to unpersist once the result is written, or None)
+    """
+    distinct_texts = df_with_text.select("text_repr").distinct().cache()
+    num_distinct = distinct_texts.count()
+    logger.info(f"{num_distinct} distinct texts across {total_rows} records")
+
+    if known_embeddings is None and num_distinct > DEDUP_MAX_DISTINCT_RATIO * total_rows:
+        distinct_texts.unpersist()
+        return embed_dataframe(df_with_text), None
+
+    texts_to_embed = distinct_texts
+    if known_embeddings is not None:
+        # Semi-join first so only the stored rows for these texts are deduplicated
+        known_embeddings = (known_embeddings
+                            .join(distinct_texts, "text_repr", "left_semi")
+                            .dropDuplicates(["text_repr"]))
+        texts_to_embed = distinct_texts.join(known_embeddings.select("text_repr"), "text_repr", "left_anti")
+
+    distinct_embedded = embed_dataframe(texts_to_embed)
+    if known_embeddings is not None:
+        distinct_embedded = distinct_embedded.unionByName(known_embeddings)
+    if num_distinct <= DEDUP_BROADCAST_MAX_TEXTS:
+        distinct_embedded = broadcast(distinct_embedded)
+    return df_with_text.join(distinct_embedded, "text_repr"), distinct_texts
+
+
 def main():
     logger.info("=" * 60)
     logger.info("NYC Taxi Ingestion & Embedding Job")
@@ -133,6 +382,11 @@ def main():
     logger.info(f"Delta Output Path: {DELTA_OUTPUT_PATH}")
     logger.info(f"gRPC Endpoint: {GRPC_HOST}:{GRPC_PORT}")
     logger.info(f"Batch Size: {BATCH_SIZE}")
+    logger.info(f"gRPC Channel Pool Size: {GRPC_POOL_SIZE}")
+    logger.info(f"Max In-Flight RPCs: {MAX_INFLIGHT_RPCS}")
+    logger.info(f"Embedding Cache Size: {EMBEDDING_CACHE_SIZE}")
+    logger.info(f"Shuffle Partitions: {SHUFFLE_PARTITIONS}")
+    logger.info(f"Executor Memory: {EXECUTOR_MEMORY}, Driver Memory: {DRIVER_MEMORY}")
 
     # Create Spark session
     spark = create_spark_session()
@@ -140,67 +394,105 @@ def main():
 
     try:
         # Read NYC Taxi data from parquet
+        # Only the used columns are read: the vectorized reader skips the other
+        # column chunks entirely (ReadSchema in the scan node)
         logger.info("Reading NYC Taxi data from parquet...")
-        df = spark.read.parquet(INPUT_PATH)
-        logger.info(f"Loaded {df.count()} records")
+        df = spark.read.parquet(INPUT_PATH).select(*INPUT_COLUMNS)
 
-        # Data preprocessing
+        # Data preprocessing; the comparisons are pushed into the parquet scan
+        # (PushedFilters) and skip row groups by their min/max statistics
         logger.info("Preprocessing data...")
         df_clean = (df
                     .filter(col("fare_amount") > 0)
                     .filter(col("trip_distance") > 0)
                     .filter(col("trip_distance") < 100)  # Remove outliers
-                    .select(
-                        col("VendorID"),
-                        col("tpep_pickup_datetime"),
-                        col("tpep_dropoff_datetime"),
-                        col("passenger_count"),
-                        col("trip_distance"),
-                        col("PULocationID"),
-                        col("DOLocationID"),
-                        col("fare_amount"),
-                        col("tip_amount"),
-                        col("total_amount")
-                    ))
-
-        logger.info(f"After filtering: {df_clean.count()} records")
+                    # A null key never matches the rerun anti-join or the MERGE,
+                    # so such a trip would be inserted again on every run
+                    .dropna(subset=MERGE_KEY_COLUMNS))
+        if logger.isEnabledFor(logging.DEBUG):
+            df_clean.explain()
+
+        # On reruns, drop trips already in the table before anything is embedded
+        existing = None
+        if DeltaTable.isDeltaTable(spark, DELTA_OUTPUT_PATH):
+            existing = DeltaTable.forPath(spark, DELTA_OUTPUT_PATH)
+            # Checked before anything is embedded: the MERGE would only fail
+            # on an incompatible table after the whole embedding pass
+            problem = embedding_table_mismatch(to_arrow_schema(existing.toDF().schema))
+            if problem is not None:
+                raise ValueError(
+                    f"Delta table at {DELTA_OUTPUT_PATH} cannot take INT8 embeddings: {problem}. "
+                    "Write to a new DELTA_OUTPUT_PATH, or remove the table to rebuild it"
+                )
+            existing_keys = existing.toDF().select(*MERGE_KEY_COLUMNS)
+            df_clean = df_clean.join(existing_keys, MERGE_KEY_COLUMNS, "left_anti")
 
         # Create text representation for embedding
         logger.info("Creating text representations...")
         df_with_text = create_text_representation(df_clean)
 
-        # Generate embeddings via gRPC
+        # The annotated rows are read twice (distinct texts, then the join
+        # back) and again on task retries, so persist them (serialized,
+        # spilling to disk); the count materializes them in the same single
+        # parquet scan instead of costing a pass of its own
+        df_with_text = df_with_text.persist(StorageLevel.MEMORY_AND_DISK)
+        clean_count = df_with_text.count()
+        logger.info(f"After filtering: {clean_count} new records")
+        if clean_count == 0:
+            logger.info("✓ Nothing new to ingest")
+            return
+
+        # Generate embeddings via gRPC (once per distinct text not yet stored)
         logger.info("Generating embeddings (this may take a while)...")
-        embedding_udf = create_embedding_udf()
-        df_with_embeddings = df_with_text.withColumn(
-            "embedding",
-            embedding_udf(col("text_repr"))
-        )
+        known_embeddings = None
+        if existing is not None:
+            known_embeddings = reusable_embeddings(existing)
+        df_with_embeddings, distinct_texts = add_embeddings(df_with_text, clean_count, known_embeddings)
 
         # Add metadata columns + year/month partition keys extracted from pickup datetime.
         # Partitioning by pickup_year/pickup_month enables partition pruning when
         # queries are scoped to a time range (e.g., "find similar rides from 2023").
         df_final = (df_with_embeddings
-                    .withColumn("ingestion_timestamp", lit(datetime.utcnow()))
-                    .withColumn("model_name", lit("all-MiniLM-L6-v2"))
-                    .withColumn("embedding_dimension", lit(384))
+                    .withColumn("ingestion_timestamp", current_timestamp())
+                    .withColumn("model_name", lit(EMBEDDING_MODEL))
+                    .withColumn("embedding_dimension", lit(EMBEDDING_DIMENSION))
+                    .withColumn("quantization", lit(EMBEDDING_QUANTIZATION))
                     .withColumn("pickup_year", year(col("tpep_pickup_datetime")))
                     .withColumn("pickup_month", month(col("tpep_pickup_datetime"))))
 
         # Write to Delta Lake partitioned by year/month for efficient time-scoped queries.
-        logger.info(f"Writing to Delta Lake: {DELTA_OUTPUT_PATH}")
-        (df_final
-         .write
-         .format("delta")
-         .mode("overwrite")  # Change to "append" for incremental loads
-         .partitionBy("pickup_year", "pickup_month")
-         .save(DELTA_OUTPUT_PATH))
+        # Shuffling by the partition columns first means each year/month is
+        # written by one task (large files, not one small file per task per
+        # month); maxRecordsPerFile still splits very large months.
+        df_final = df_final.repartition("pickup_year", "pickup_month")
+        if existing is not None:
+            # Insert-only MERGE: reruns never duplicate a trip and existing
+            # files are only read for the key match, never rewritten
+            logger.info(f"Merging into Delta Lake: {DELTA_OUTPUT_PATH}")
+            merge_condition = " AND ".join(f"t.{c} = s.{c}" for c in MERGE_KEY_COLUMNS)
+            (existing.alias("t")
+             .merge(df_final.alias("s"), merge_condition)
+             .whenNotMatchedInsertAll()
+             .execute())
+        else:
+            logger.info(f"Writing to Delta Lake: {DELTA_OUTPUT_PATH}")
+            (df_final
+             .write
+             .format("delta")
+             .partitionBy("pickup_year", "pickup_month")
+             .save(DELTA_OUTPUT_PATH))
 
         logger.info("✓ Ingestion job completed successfully!")
 
-        # Show sample results
+        # The join has been written; release the cached inputs
+        df_with_text.unpersist()
+        if distinct_texts is not None:
+            distinct_texts.unpersist()
+
+        # Show sample results, read back from the written table: showing
+        # df_final would re-run the whole pipeline, embeddings included
         logger.info("Sample embedded records:")
-        df_final.select(
+        spark.read.format("delta").load(DELTA_OUTPUT_PATH).select(
             "PULocationID", "DOLocationID", "trip_distance", "fare_amount", "embedding_dimension"
         ).show(5, truncate=False)
 
@@ -0,0 +1,65 @@
+"""
+INT8 Embedding Storage Format
+Embeddings are stored in Delta as struct<q: array<tinyint>, scale: float>
+with embedding ≈ q * scale: 4x smaller than FP32. The ingestion job
+(ingest_and_embed.py) writes this format and scripts/build_faiss_index.py
+dequantizes it when building the index. Plain numpy/pyarrow, no Spark.
+"""
+from typing import Optional
+import numpy as np
+import pyarrow as pa
+
+# Arrow type of the stored embedding column
+EMBEDDING_ARROW_TYPE = pa.struct([("q", pa.list_(pa.int8())), ("scale", pa.float32())])
+
+
+def quantize_int8(embeddings: np.ndarray):
+    """
+    Symmetric per-vector INT8 quantization: q = round(v / scale) with
+    scale = max|v| / 127, so v ≈ q * scale.
+
+    Returns:
+        Tuple of (int8 codes of the same shape, float32 scales of shape [n])
+    """
+    scales = np.abs(embeddings).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0  # zero vectors stay all-zero codes
+    codes = np.rint(embeddings / scales[:, np.newaxis]).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def int8_struct_array(codes: np.ndarray, scales: np.ndarray) -> pa.StructArray:
+    """
+    Pack (n, d) INT8 codes and n scales into a struct<q: list<int8>, scale: float>
+    Arrow array, building the list column straight from the flat code buffer:
+    every list is d long, so the offsets are a plain range.
+    """
+    n, d = codes.shape
+    offsets = np.arange(0, (n + 1) * d, d, dtype=np.int32)
+    q = pa.ListArray.from_arrays(offsets, pa.array(codes.reshape(-1), type=pa.int8()))
+    return pa.StructArray.from_arrays([q, pa.array(scales, type=pa.float32())], names=["q", "scale"])
+
+
+def _type_signature(data_type: pa.DataType) -> str:
+    """Type as a string, ignoring field nullability and list item names (which differ between writers)."""
+    if pa.types.is_struct(data_type):
+        return "struct<" + ",".join(f"{field.name}:{_type_signature(field.type)}" for field in data_type) + ">"
+    if pa.types.is_list(data_type) or pa.types.is_large_list(data_type):
+        return f"list<{_type_signature(data_type.value_type)}>"
+    return str(data_type)
+
+
+def embedding_table_mismatch(schema: pa.Schema) -> Optional[str]:
+    """
+    Why rows in this format cannot be merged into a table with the given
+    (Arrow) schema, or None if they can. Tables written before INT8 storage
+    hold FP32 array<float> embeddings and no quantization column.
+    """
+    if "embedding" not in schema.names:
+        return "it has no embedding column"
+    stored = _type_signature(schema.field("embedding").type)
+    expected = _type_signature(EMBEDDING_ARROW_TYPE)
+    if stored != expected:
+        return f"its embeddings are {stored}, not {expected}"
+    if "quantization" not in schema.names:
+        return "it has no quantization column"
+    return None
@@ -0,0 +1 @@
+# Test package for the Spark job and index builder helpers
@@ -0,0 +1,97 @@
+"""
+Unit tests for the INT8 embedding storage format
+Tests that embeddings quantized by the ingestion job and dequantized by the
+index builder (scripts/build_faiss_index.py) round-trip within half a step.
+"""
+import sys
+import os
+
+# The quantizer lives in spark/jobs/, the index builder in scripts/
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'jobs')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'scripts')))
+
+import numpy as np  # noqa: E402
+import pyarrow as pa  # noqa: E402
+import pytest  # noqa: E402
+from deltalake import DeltaTable, write_deltalake  # noqa: E402
+from quantization import embedding_table_mismatch, int8_struct_array, quantize_int8  # noqa: E402
+from build_faiss_index import _embedding_column_to_matrix  # noqa: E402
+
+
+@pytest.fixture
+def embeddings():
+    """Unit-norm vectors (as the model outputs), a zero vector and a tiny one"""
+    np.random.seed(42)
+    vectors = np.random.standard_normal((100, 384)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors[10] = 0.0
+    vectors[20] = np.float32(1e-30) * np.sign(vectors[20])
+    return vectors
+
+
+def test_int8_round_trip_within_half_a_step(embeddings):
+    """Test dequantized vectors are within scale/2 of the originals"""
+    codes, scales = quantize_int8(embeddings)
+
+    restored = _embedding_column_to_matrix(int8_struct_array(codes, scales))
+
+    assert codes.dtype == np.int8 and scales.dtype == np.float32
+    assert restored.dtype == np.float32 and restored.shape == embeddings.shape
+    assert np.abs(codes).max() == 127
+    error = np.abs(restored - embeddings)
+    assert (error <= scales[:, np.newaxis] / 2 * (1 + 1e-5)).all()
+
+
+def test_int8_zero_vector_stays_zero(embeddings):
+    """Test a zero vector gets all-zero codes and a finite scale, not NaNs"""
+    codes, scales = quantize_int8(embeddings)
+
+    restored = _embedding_column_to_matrix(int8_struct_array(codes, scales))
+
+    assert (codes[10] == 0).all()
+    assert scales[10] == 1.0
+    assert (restored[10] == 0).all()
+    assert np.isfinite(restored).all()
+
+
+def test_int8_struct_array_slices(embeddings):
+    """Test a sliced struct column (non-zero offset) dequantizes the right rows"""
+    codes, scales = quantize_int8(embeddings)
+    column = int8_struct_array(codes, scales)
+
+    restored = _embedding_column_to_matrix(column.slice(30, 5))
+
+    np.testing.assert_array_equal(restored, codes[30:35] * scales[30:35, np.newaxis])
+
+
+def test_current_table_schema_accepted(embeddings, tmp_path):
+    """Test a Delta table holding the INT8 struct accepts new rows"""
+    codes, scales = quantize_int8(embeddings[:3])
+    write_deltalake(str(tmp_path), pa.table({
+        "text_repr": ["a", "b", "c"],
+        "embedding": int8_struct_array(codes, scales),
+        "quantization": ["int8"] * 3,
+    }))
+
+    assert embedding_table_mismatch(DeltaTable(str(tmp_path)).schema().to_pyarrow()) is None
+
+
+def test_fp32_table_schema_rejected(embeddings, tmp_path):
+    """Test a table from before INT8 storage (array<float>, no quantization column) is rejected"""
+    write_deltalake(str(tmp_path), pa.table({
+        "text_repr": ["a", "b"],
+        "embedding": pa.array(embeddings[:2].tolist(), type=pa.list_(pa.float32())),
+    }))
+
+    problem = embedding_table_mismatch(DeltaTable(str(tmp_path)).schema().to_pyarrow())
+
+    assert problem is not None
+    assert "list<float>" in problem
+
+
+def test_table_without_quantization_column_rejected(embeddings, tmp_path):
+    """Test an INT8 table missing the quantization column is rejected (MERGE inserts it)"""
+    codes, scales = quantize_int8(embeddings[:1])
+    write_deltalake(str(tmp_path), pa.table({"embedding": int8_struct_array(codes, scales)}))
+
+    assert "quantization" in embedding_table_mismatch(DeltaTable(str(tmp_path)).schema().to_pyarrow())
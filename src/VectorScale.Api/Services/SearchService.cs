@@ -1,5 +1,7 @@
 using System.Diagnostics;
+using System.Runtime.InteropServices;
 using System.Text.Json;
+using Google.Protobuf;
 using Microsoft.Extensions.Options;
 using VectorScale.Api.Configuration;
 using VectorScale.Api.Infrastructure.Observability;
@@ -63,19 +65,27 @@ public class SearchService : ISearchService
             ShardKey = shardKey,
             Nprobe = request.Nprobe ?? _faissOptions.DefaultNprobe
         };
-        grpcRequest.QueryVector.AddRange(vector);
+        // Send the vector as packed float32 bytes (read zero-copy by the sidecar)
+        grpcRequest.QueryVectorPacked = ByteString.CopyFrom(MemoryMarshal.AsBytes(vector.AsSpan()));
 
         var grpcResponse = await _indexService.SearchAsync(grpcRequest, cancellationToken);
 
-        // 4. Map results
-        var results = grpcResponse.Results.Select(r => new SearchResultItem
-        {
-            Id = r.Id,
-            Score = r.Score,
-            Metadata = string.IsNullOrEmpty(r.MetadataJson)
-                ? []
-                : JsonSerializer.Deserialize<Dictionary<string, object?>>(r.MetadataJson) ?? []
-        }).ToList();
+        // 4. Map results (packed ids/scores; per-result messages from older sidecars)
+        var results = grpcResponse.Ids.Count > 0
+            ? grpcResponse.Ids.Select((id, i) => new SearchResultItem
+            {
+                Id = id,
+                Score = grpcResponse.Scores[i],
+                Metadata = []
+            }).ToList()
+            : grpcResponse.Results.Select(r => new SearchResultItem
+            {
+                Id = r.Id,
+                Score = r.Score,
+                Metadata = string.IsNullOrEmpty(r.MetadataJson)
+                    ? []
+                    : JsonSerializer.Deserialize<Dictionary<string, object?>>(r.MetadataJson) ?? []
+            }).ToList();
 
         // Apply pagination
         var skip = (request.Page - 1) * request.PageSize;